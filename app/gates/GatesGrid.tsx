@@ -1,13 +1,5 @@
-import fs from 'fs';
-import path from 'path';
 import Link from 'next/link';
-
-interface Gate {
-  n: number;
-  gate_id: number;
-  table: number[][];
-  flat: number[];
-}
+import { loadGateIndex, loadGatePage } from '@/lib/gate-data';
 
 function getColorClass(value: number): string {
   switch (value) {
@@ -164,25 +156,15 @@ function Pagination({ currentPage, totalPages }: { currentPage: number; totalPag
 }
 
 export default function GatesGrid({ currentPage }: { currentPage: number }) {
-  const GATES_PER_PAGE = 60; // Show 60 gates per page
-  const TOTAL_GATES = 3774;
+  const { count: TOTAL_GATES, page_size: GATES_PER_PAGE } = loadGateIndex();
   const totalPages = Math.ceil(TOTAL_GATES / GATES_PER_PAGE);
   
   // Calculate which gates to load
   const startGateId = (currentPage - 1) * GATES_PER_PAGE;
   const endGateId = Math.min(startGateId + GATES_PER_PAGE, TOTAL_GATES);
   
-  // Load only the gates for this page
-  const gatesDir = path.join(process.cwd(), 'gates');
-  const gates: Gate[] = [];
-  
-  for (let i = startGateId; i < endGateId; i++) {
-    const filePath = path.join(gatesDir, `gate_${i.toString().padStart(4, '0')}.json`);
-    if (fs.existsSync(filePath)) {
-      const content = fs.readFileSync(filePath, 'utf-8');
-      gates.push(JSON.parse(content));
-    }
-  }
+  // Load only the grid shard for this page
+  const gates = loadGatePage(currentPage);
 
   return (
     <>
@@ -1,24 +1,7 @@
-import fs from 'fs';
-import path from 'path';
 import Link from 'next/link';
 import { notFound } from 'next/navigation';
 import InteractiveTandTree from './InteractiveTandTree';
-
-interface TandNode {
-  op: string;
-  left?: TandNode | string | number;
-  right?: TandNode | string | number;
-}
-
-interface Gate {
-  n: number;
-  gate_id: number;
-  table: number[][];
-  flat: number[];
-  tand_representation?: TandNode;
-  tand_string?: string;
-  tand_operations?: number;
-}
+import { loadGate, loadGateIndex } from '@/lib/gate-data';
 
 function getColorClass(value: number): string {
   switch (value) {
@@ -38,23 +21,21 @@ export default async function GateDetailPage({ params }: { params: Promise<{ id:
   const { id } = await params;
   const gateId = parseInt(id);
   
-  if (isNaN(gateId) || gateId < 0 || gateId > 3773) {
+  const { count } = loadGateIndex();
+  if (isNaN(gateId) || gateId < 0 || gateId >= count) {
     notFound();
   }
 
-  // Load the specific gate file
-  const gatesDir = path.join(process.cwd(), 'gates');
-  const filePath = path.join(gatesDir, `gate_${gateId.toString().padStart(4, '0')}.json`);
+  // Load the specific gate from its compressed bundle
+  const gate = loadGate(gateId);
   
-  if (!fs.existsSync(filePath)) {
+  if (!gate) {
     notFound();
   }
 
-  const gate: Gate = JSON.parse(fs.readFileSync(filePath, 'utf-8'));
-
   // Get adjacent gate IDs
   const prevId = gateId > 0 ? gateId - 1 : null;
-  const nextId = gateId < 3773 ? gateId + 1 : null;
+  const nextId = gateId < count - 1 ? gateId + 1 : null;
 
   return (
     <div className="min-h-screen bg-white dark:bg-black">
@@ -225,7 +206,7 @@ export default async function GateDetailPage({ params }: { params: Promise<{ id:
 
 // Generate static params for all gates
 export async function generateStaticParams() {
-  return Array.from({ length: 3774 }, (_, i) => ({
+  return Array.from({ length: loadGateIndex().count }, (_, i) => ({
     id: i.toString(),
   }));
 }
@@ -0,0 +1,304 @@
+"""
+Benchmark suite for gate generation and TAND representation search.
+
+Every benchmark runs on fixed inputs drawn from a fixed seed, is repeated a
+few times, and reports its median time and throughput. Results are saved as
+JSON and can be compared against a stored baseline to catch regressions.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+import find_tand_representations as finder
+import generate_gates
+from gate_store import GateStore, _write_json, export_web_data
+
+
+SEED = 20240601
+RESULTS_FILE = "benchmark_results.json"
+BASELINE_FILE = "benchmark_baseline.json"
+# A benchmark regresses when its throughput drops by more than this fraction.
+TOLERANCE = 0.25
+SEARCH_DEPTHS = (3, 4, 5)
+# The searches run serially, so that their times do not depend on how many
+# cores the machine has or which parallel backend "auto" picks there.
+SEARCH_EXECUTOR = "serial"
+# Results fields that must match the baseline for throughputs to compare.
+ENVIRONMENT = ("python", "numpy", "machine", "cpu_count", "executor")
+
+
+def _random_expression(rng: np.random.Generator, depth: int):
+    """Builds a random TAND tree of exactly `depth` levels."""
+    if depth == 0:
+        return finder.BASE_EXPRESSIONS[rng.integers(len(finder.BASE_EXPRESSIONS))]
+    deep = _random_expression(rng, depth - 1)
+    shallow = _random_expression(rng, int(rng.integers(depth)))
+    left, right = (deep, shallow) if rng.integers(2) else (shallow, deep)
+    return {"op": "TAND", "left": left, "right": right}
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Silences the progress output of the code being timed."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+class _Suite:
+    """
+    Builds the fixed inputs once and yields (name, items, function) triples.
+
+    `items` is the amount of work one call of `function` does, so that
+    throughputs stay comparable if a benchmark's size changes.
+    """
+
+    def __init__(self, workdir: str, depths: Tuple[int, ...]):
+        self.workdir = workdir
+        self.depths = depths
+        rng = np.random.default_rng(SEED)
+        self.expressions = [_random_expression(rng, 5) for _ in range(200)]
+        self.points = rng.integers(3, size=(2000, 2)).tolist()
+        function_ids = rng.choice(finder.NUM_FUNCTIONS, size=2000, replace=False)
+        self.known_tables = finder.ALL_TABLES[np.sort(function_ids)]
+        self.seen = np.zeros(finder.NUM_FUNCTIONS, dtype=bool)
+        self.seen[function_ids] = True
+
+        n = 3
+        self.constraint_sets = [
+            generate_gates.complete_constraint_set(z_set, n)
+            for z_set in generate_gates.build_constraint_sets(n)
+        ]
+        ids, class_ids = generate_gates.enumerate_classes(n)
+        self.store_path = os.path.join(workdir, "gates.bin")
+        GateStore.from_tables(
+            n, generate_gates.operators_from_ids(n, ids), class_ids
+        ).save(self.store_path)
+        with _quiet():
+            self.found_gates = finder.find_tand_representations(
+                max_depth=max(depths),
+                store_path=self.store_path,
+                executor=SEARCH_EXECUTOR,
+            )
+
+    def benchmarks(self) -> List[Tuple[str, int, Callable[[], object]]]:
+        def evaluate_points():
+            expr = self.expressions[0]
+            for x, y in self.points:
+                finder.evaluate_expression(expr, x, y)
+
+        def flat_tables():
+            for expr in self.expressions:
+                finder.expr_to_flat_table(expr)
+
+        def process_chunk():
+            count = len(self.known_tables)
+            finder._process_chunk((0, count, 0, count), self.known_tables, self.seen)
+
+        def intersect_pairs():
+            sets = self.constraint_sets[:40]
+            for a in sets:
+                for b in sets:
+                    generate_gates.intersect(a, b)
+
+        def update_store():
+            with _quiet():
+                finder.update_gate_store(self.found_gates, self.store_path)
+
+        def export_web():
+            export_web_data(
+                GateStore.open(self.store_path), os.path.join(self.workdir, "web")
+            )
+
+        def search(depth: int):
+            def run():
+                with _quiet():
+                    finder.find_tand_representations(
+                        max_depth=depth,
+                        store_path=self.store_path,
+                        executor=SEARCH_EXECUTOR,
+                    )
+
+            return run
+
+        def quiet(function, *args):
+            def run():
+                with _quiet():
+                    function(*args)
+
+            return run
+
+        return [
+            ("evaluate_expression", len(self.points), evaluate_points),
+            ("expr_to_flat_table", len(self.expressions), flat_tables),
+            ("process_chunk", len(self.known_tables) ** 2, process_chunk),
+            ("magic_enumerate_3", 3 ** 9, quiet(generate_gates.magic_enumerate, 3)),
+            ("intersect", 40 * 40, intersect_pairs),
+            (
+                "union_length_3",
+                len(self.constraint_sets),
+                lambda: generate_gates.union_length(self.constraint_sets),
+            ),
+            ("load_gates", finder.NUM_GATES, quiet(finder._load_gates, self.store_path)),
+            ("update_gate_store", finder.NUM_GATES, update_store),
+            ("export_web_data", finder.NUM_GATES, export_web),
+        ] + [
+            (f"search_depth_{depth}", finder.NUM_GATES, search(depth))
+            for depth in self.depths
+        ]
+
+
+def run_benchmarks(
+    names: List[str] = None, repeat: int = 5, depths: Tuple[int, ...] = SEARCH_DEPTHS
+) -> Dict:
+    """
+    Runs the benchmarks (all, or those in `names`) `repeat` times each.
+
+    Returns:
+        The results: the environment, and for every benchmark its median and
+        minimum seconds, its items per call and its median throughput.
+    """
+    results = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "executor": SEARCH_EXECUTOR,
+        "seed": SEED,
+        "benchmarks": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        suite = _Suite(workdir, depths)
+        for name, items, function in suite.benchmarks():
+            if names and name not in names:
+                continue
+            times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                function()
+                times.append(time.perf_counter() - start)
+            median = statistics.median(times)
+            results["benchmarks"][name] = {
+                "seconds": median,
+                "min_seconds": min(times),
+                "items": items,
+                "throughput": items / median,
+            }
+            print(f"{name:24s} {median * 1000:10.2f} ms {items / median:16,.0f} items/s")
+    return results
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float = TOLERANCE) -> List[str]:
+    """
+    Compares throughputs with a baseline and prints the ratio of each.
+
+    Differences in the ENVIRONMENT fields, such as the CPU count, are
+    reported first: throughputs from another environment measure it more
+    than the code.
+
+    Returns:
+        The names of the benchmarks whose throughput dropped by more than
+        `tolerance`.
+    """
+    mismatches = [
+        f"{key} {baseline.get(key)} -> {results[key]}"
+        for key in ENVIRONMENT
+        if baseline.get(key) != results[key]
+    ]
+    if mismatches:
+        print(
+            "\nWarning: the baseline was recorded in another environment "
+            f"({', '.join(mismatches)}); record a new one with --save-baseline."
+        )
+
+    regressions = []
+    print(f"\n{'benchmark':24s} {'baseline':>16s} {'current':>16s} {'ratio':>7s}")
+    for name, result in results["benchmarks"].items():
+        if name not in baseline.get("benchmarks", {}):
+            print(f"{name:24s} {'(new)':>16s}")
+            continue
+        before = baseline["benchmarks"][name]["throughput"]
+        ratio = result["throughput"] / before
+        flag = ""
+        if ratio < 1 - tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"{name:24s} {before:16,.0f} {result['throughput']:16,.0f} "
+            f"{ratio:7.2f}{flag}"
+        )
+    return regressions
+
+
+def main():
+    """Runs the benchmarks, saves them and compares them with the baseline."""
+    parser = argparse.ArgumentParser(
+        description="Benchmark gate generation and TAND representation search."
+    )
+    parser.add_argument("names", nargs="*", help="benchmarks to run (default: all)")
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="runs per benchmark (default: 5)"
+    )
+    parser.add_argument(
+        "--depths",
+        type=int,
+        nargs="+",
+        default=SEARCH_DEPTHS,
+        help="depths of the end-to-end search runs (default: 3 4 5)",
+    )
+    parser.add_argument(
+        "--output",
+        default=RESULTS_FILE,
+        help=f"where to save the results (default: {RESULTS_FILE})",
+    )
+    parser.add_argument(
+        "--baseline",
+        default=BASELINE_FILE,
+        help=f"results to compare against (default: {BASELINE_FILE})",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="also save the results as the new baseline",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=TOLERANCE,
+        help=f"largest allowed drop in throughput (default: {TOLERANCE})",
+    )
+    args = parser.parse_args()
+    if not args.save_baseline and not os.path.exists(args.baseline):
+        parser.error(
+            f"no baseline at {args.baseline}; pass --baseline PATH, or "
+            "--save-baseline to record one"
+        )
+
+    results = run_benchmarks(args.names, args.repeat, tuple(args.depths))
+    _write_json(args.output, results)
+    print(f"\nSaved results to {args.output}")
+
+    regressions = []
+    if not args.save_baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+    if args.save_baseline:
+        _write_json(args.baseline, results)
+        print(f"Saved baseline to {args.baseline}")
+    if regressions:
+        print(f"\n{len(regressions)} benchmarks regressed: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
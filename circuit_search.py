@@ -0,0 +1,287 @@
+"""
+Smallest shared TAND circuits for one or more functions.
+
+A formula tree counts a repeated subexpression every time it appears; a
+circuit is a straight-line program whose gate outputs any later gate may
+use, so its gate count is what a shared implementation costs.
+synthesize_circuit finds the smallest one exactly, for small circuits.
+"""
+
+import os
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+import cost_matrix
+import find_tand_representations as finder
+
+
+class _CircuitSearch:
+    """
+    Exact search for the smallest straight-line TAND program that computes a
+    set of target tables.
+
+    A program starts from the leaves and appends one TAND gate at a time,
+    whose operands may be any leaf or earlier gate, so a shared
+    subexpression is built once however often it is used. Solving for one
+    gate count after another, a program of the current count is only
+    searched in one canonical order: a gate that does not use the gate just
+    before it must have a larger function id, so each set of gates is tried
+    once rather than once per topological order. The function id bitmap of
+    the program rejects gates that recompute a known table. As no smaller
+    program exists, every gate that is not a target must feed a later gate,
+    so a partial program is abandoned once its remaining gates have too few
+    operands left for the gates nothing can use yet, and the gate before the
+    last target is only tried if that target can be built from it.
+    """
+
+    def __init__(self, target_ids: Sequence[int], max_gates: int):
+        leaf_ids = [
+            finder.flat_to_id(finder.expr_to_flat_table(e))
+            for e in finder.BASE_EXPRESSIONS
+        ]
+        self.targets = np.zeros(finder.NUM_FUNCTIONS, dtype=bool)
+        self.targets[list(target_ids)] = True
+        self.targets[leaf_ids] = False
+        self.known = np.zeros(finder.NUM_FUNCTIONS, dtype=bool)
+        self.ids = []
+        self.missing = int(self.targets.sum())
+        size = len(leaf_ids) + max_gates
+        self.tables = np.zeros((size, 9), dtype=np.uint8)
+        # compositions[a, b] is the function id of TAND(entry a, entry b).
+        self.compositions = np.zeros((size, size), dtype=np.int32)
+        # uses[e] counts the gates that entry e can be an operand of; only
+        # the gates that are not targets need one.
+        self.uses = np.zeros(size, dtype=np.int32)
+        self.needs_use = np.zeros(size, dtype=bool)
+        self.unused = 0
+        self.leaf_count = len(leaf_ids)
+        self._positions = np.arange(9)
+        for func_id in leaf_ids:
+            self._push(func_id)
+        self._failed = set()
+
+    def _push(self, func_id: int):
+        """Appends the entry `func_id`, marking the entries it can use."""
+        count = len(self.ids)
+        self.tables[count] = finder.ALL_TABLES[func_id]
+        tables = self.tables[: count + 1].astype(np.intp)
+        codes = np.stack([3 * tables[-1] + tables, 3 * tables + tables[-1]])
+        row, column = finder.TAND_WEIGHTS[self._positions, codes].sum(axis=2)
+        self.compositions[count, : count + 1] = row
+        self.compositions[: count + 1, count] = column
+        self.ids.append(func_id)
+        self.known[func_id] = True
+        self.missing -= int(self.targets[func_id])
+
+        matches = self.compositions[:count, :count] == func_id
+        operands = matches.any(axis=0) | matches.any(axis=1)
+        self.unused -= int(
+            (operands & self.needs_use[:count] & (self.uses[:count] == 0)).sum()
+        )
+        self.uses[:count] += operands
+        self.needs_use[count] = count >= self.leaf_count and not self.targets[func_id]
+        self.unused += int(self.needs_use[count])
+
+    def _pop(self):
+        """Removes the last entry, undoing _push."""
+        func_id = self.ids.pop()
+        count = len(self.ids)
+        self.known[func_id] = False
+        self.missing += int(self.targets[func_id])
+        matches = self.compositions[:count, :count] == func_id
+        operands = matches.any(axis=0) | matches.any(axis=1)
+        self.uses[:count] -= operands
+        self.unused += int(
+            (operands & self.needs_use[:count] & (self.uses[:count] == 0)).sum()
+        )
+        self.unused -= int(self.needs_use[count])
+
+    def _extend(self, remaining: int) -> bool:
+        """Tries to complete the program with `remaining` more gates."""
+        if self.missing == 0:
+            return remaining == 0
+        if self.missing > remaining:
+            return False
+        # Each remaining gate has two operands, and those that are not
+        # targets need one of them too.
+        if self.unused + remaining - self.missing > 2 * remaining:
+            return False
+        if remaining == 0:
+            return True
+        key = (frozenset(self.ids), self.ids[-1], remaining)
+        if key in self._failed:
+            return False
+
+        count = len(self.ids)
+        compositions = self.compositions[:count, :count]
+        if count == self.leaf_count:
+            allowed = compositions
+        else:
+            last = count - 1
+            allowed = compositions[
+                (compositions > self.ids[last])
+                | (np.arange(count) == last)[:, None]
+                | (np.arange(count) == last)[None, :]
+            ]
+        candidates = np.unique(allowed)
+        candidates = candidates[~self.known[candidates]]
+        is_target = self.targets[candidates]
+        if remaining == self.missing:
+            candidates = candidates[is_target]
+        elif remaining == 2:
+            # One gate, then the last missing target: only keep the gates
+            # that the target can be built from.
+            target = int(np.flatnonzero(self.targets & ~self.known)[0])
+            candidates = candidates[~is_target]
+            tables = self.tables[:count]
+            gate_tables = finder.ALL_TABLES[candidates]
+            codes = (3 * gate_tables + gate_tables).astype(np.intp)
+            builds = (
+                (finder.compose_tables(gate_tables, tables) == target).any(axis=1)
+                | (finder.compose_tables(tables, gate_tables) == target).any(axis=0)
+                | (finder.TAND_WEIGHTS[self._positions, codes].sum(axis=1) == target)
+            )
+            candidates = candidates[builds]
+        else:
+            # Targets first: they are the likeliest to complete the program.
+            candidates = np.concatenate([candidates[is_target], candidates[~is_target]])
+
+        for func_id in candidates.tolist():
+            self._push(func_id)
+            if self._extend(remaining - 1):
+                return True
+            self._pop()
+        self._failed.add(key)
+        return False
+
+    def solve(self, gate_count: int) -> bool:
+        """
+        Looks for a program of exactly `gate_count` gates, which must not
+        exist for any smaller count. On success the program is left in `ids`.
+        """
+        self._failed.clear()
+        return self._extend(gate_count)
+
+    def program(self) -> List[Tuple[int, int]]:
+        """Returns the (left, right) entries of each gate of the found program."""
+        steps = []
+        for entry in range(self.leaf_count, len(self.ids)):
+            left, right = np.argwhere(
+                self.compositions[:entry, :entry] == self.ids[entry]
+            )[0]
+            steps.append((int(left), int(right)))
+        return steps
+
+
+def _catalog_circuit(
+    target_ids: Sequence[int], path: str
+) -> Union[Tuple[List[Tuple[int, int]], List[int]], None]:
+    """
+    Builds a circuit from the catalogued formulas of the targets.
+
+    The catalog store is hash-consed, so the formulas already share every
+    common subexpression: the circuit has one gate per distinct node. A
+    node is created after its operands, so node order is a valid gate order.
+
+    Returns:
+        A tuple of the (left, right) entries of each gate, where entries
+        0..4 are the leaves and the gates follow, and the entry of each
+        target; or None if a target is not in the catalog.
+    """
+    store, roots = finder.load_catalog(path)
+    if store.basis != finder.TAND_BASIS:
+        raise ValueError(
+            f"Catalog {path} was written with basis "
+            f"{[name for name, _ in store.basis]}."
+        )
+    nodes = [int(roots[func_id]) for func_id in target_ids]
+    if min(nodes) < 0:
+        return None
+    reached, stack = set(), list(nodes)
+    while stack:
+        node = stack.pop()
+        if node not in reached and not store.is_leaf(node):
+            reached.add(node)
+            stack.extend((store.left[node], store.right[node]))
+    entries = {
+        store.leaf(leaf): entry for entry, leaf in enumerate(finder.BASE_EXPRESSIONS)
+    }
+    steps = []
+    for node in sorted(reached):
+        entries[node] = len(finder.BASE_EXPRESSIONS) + len(steps)
+        steps.append((entries[store.left[node]], entries[store.right[node]]))
+    return steps, [entries[node] for node in nodes]
+
+
+def synthesize_circuit(
+    flat_tables: Sequence[Sequence[int]],
+    max_gates: int = 8,
+    catalog_path: str = None,
+) -> Union[Dict, None]:
+    """
+    Finds the smallest TAND circuit that computes all the given functions.
+
+    Unlike a formula tree, a circuit builds each subexpression once and may
+    feed its output to any number of later gates, so its gate count is what
+    a shared implementation of the functions costs. The search is exact and
+    stops below the best known circuit: the separate minimal formula trees,
+    or the shared catalogued formulas when a catalog is given.
+
+    Args:
+        flat_tables: The 9-element flat truth tables of the functions.
+        max_gates: The largest circuit to search for.
+        catalog_path: A catalog written by find_tand_representations. Its
+            formulas are returned when no smaller circuit is found within
+            max_gates, as the best circuit known rather than the smallest.
+
+    Returns:
+        A dict with the "gates" count, the "program" as a list of
+        (name, left, right) steps, where the gates are named g1, g2, ... and
+        operands are gate or leaf names, the "outputs" naming the gate or
+        leaf that computes each function, whether the circuit is "exact"
+        (the smallest), and the "tree_operations" that separate minimal
+        formula trees need. None if a function is not reachable from TAND,
+        or if no circuit of at most max_gates gates was found and none is
+        catalogued.
+    """
+    target_ids = [finder.flat_to_id(flat) for flat in flat_tables]
+    tree_costs = cost_matrix.closure_costs(
+        finder.basis_weights(finder.TAND_BASIS), np.array(target_ids)
+    )
+    if (tree_costs[target_ids] == cost_matrix.UNREACHABLE).any():
+        return None
+    tree_operations = int(tree_costs[np.unique(target_ids)].sum())
+
+    known = None
+    if catalog_path is not None and os.path.exists(catalog_path):
+        known = _catalog_circuit(target_ids, catalog_path)
+    known_gates = tree_operations if known is None else len(known[0])
+    gate_limit = min(max_gates, known_gates - (known is not None))
+
+    search = _CircuitSearch(target_ids, max(gate_limit, 0))
+    exact = True
+    for gate_count in range(search.missing, gate_limit + 1):
+        if search.solve(gate_count):
+            steps = search.program()
+            outputs = [search.ids.index(func_id) for func_id in target_ids]
+            break
+    else:
+        if known is None:
+            return None
+        steps, outputs = known
+        exact = gate_limit >= len(steps) - 1
+
+    names = list(finder.BASE_EXPRESSIONS) + [
+        f"g{gate}" for gate in range(1, len(steps) + 1)
+    ]
+    return {
+        "gates": len(steps),
+        "program": [
+            (names[entry], names[left], names[right])
+            for entry, (left, right) in enumerate(steps, len(finder.BASE_EXPRESSIONS))
+        ],
+        "outputs": [names[entry] for entry in outputs],
+        "exact": exact,
+        "tree_operations": tree_operations,
+    }
@@ -0,0 +1,402 @@
+"""
+Batched simulator for TAND formulas and circuits.
+
+A formula, a set of formulas sharing subexpressions, or a chain of gates is
+compiled once into a flat list of lookup instructions over uint8 registers,
+then evaluated on NumPy arrays of inputs, a chunk of rows at a time.
+"""
+
+import argparse
+import os
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from find_tand_representations import TAND_TABLE, ExpressionStore
+from gate_store import GATE_STORE_FILE, GateStore, parse_formula
+
+
+# Rows evaluated per pass over the instructions; small enough that every
+# register of a chunk stays in cache.
+CHUNK_SIZE = 1 << 16
+DEFAULT_INPUTS = ("x", "y")
+CONSTANTS = ("0", "1", "2")
+
+
+class CompiledCircuit:
+    """
+    A straight-line program of 9-entry lookups over uint8 registers.
+
+    Registers 0..I-1 hold the inputs and register I holds zeros. Instruction
+    k writes register I + 1 + k with tables[k][3 * left + right], where left
+    and right are earlier registers. A subexpression that depends on at most
+    two inputs, such as a whole two-input gate formula, is folded into a
+    single lookup on those inputs when compiled, so only the gates that
+    combine three or more inputs cost an instruction each.
+    """
+
+    def __init__(
+        self,
+        inputs: Sequence[str],
+        tables: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        outputs: Sequence[int],
+    ):
+        self.inputs = list(inputs)
+        self.tables = np.asarray(tables, dtype=np.uint8).reshape(-1, 9)
+        self.left = np.asarray(left, dtype=np.intp)
+        self.right = np.asarray(right, dtype=np.intp)
+        self.outputs = list(outputs)
+
+    def __len__(self) -> int:
+        return len(self.tables)
+
+    def run(
+        self, values: np.ndarray, out: np.ndarray = None, chunk_size: int = CHUNK_SIZE
+    ) -> np.ndarray:
+        """
+        Evaluates the circuit on rows of input values.
+
+        Args:
+            values: An (N, I) array of input values (0, 1 or 2), one column
+                per input in the order of `inputs`. It may be memory-mapped:
+                it is read one chunk of rows at a time.
+            out: An optional (N, O) uint8 array to write the outputs to.
+            chunk_size: The number of rows evaluated per pass.
+
+        Returns:
+            The (N, O) uint8 array of outputs, one column per output.
+        """
+        rows = len(values)
+        if out is None:
+            out = np.empty((rows, len(self.outputs)), dtype=np.uint8)
+        input_count = len(self.inputs)
+        registers = np.zeros(
+            (input_count + 1 + len(self), min(chunk_size, max(rows, 1))),
+            dtype=np.uint8,
+        )
+        scratch = np.empty(registers.shape[1], dtype=np.uint8)
+
+        for start in range(0, rows, chunk_size):
+            size = min(chunk_size, rows - start)
+            chunk = registers[:, :size]
+            chunk[:input_count] = np.asarray(values[start : start + size]).T
+            codes = scratch[:size]
+            for index, (table, left, right) in enumerate(
+                zip(self.tables, self.left, self.right), input_count + 1
+            ):
+                np.multiply(chunk[left], 3, out=codes)
+                np.add(codes, chunk[right], out=codes)
+                np.take(table, codes, out=chunk[index])
+            out[start : start + size] = chunk[self.outputs].T
+        return out
+
+    def __call__(self, *columns: np.ndarray) -> np.ndarray:
+        """
+        Evaluates the circuit on one array per input, e.g. circuit(x, y).
+
+        Returns:
+            A uint8 array shaped like the inputs for a single output, or with
+            one more leading axis of outputs otherwise.
+        """
+        if len(columns) != len(self.inputs):
+            raise ValueError(
+                f"Expected {len(self.inputs)} input arrays {self.inputs}, "
+                f"got {len(columns)}."
+            )
+        columns = np.broadcast_arrays(*[np.asarray(c, dtype=np.uint8) for c in columns])
+        shape = columns[0].shape
+        values = np.stack([column.ravel() for column in columns], axis=1)
+        result = self.run(values).T.reshape((len(self.outputs),) + shape)
+        return result[0] if len(self.outputs) == 1 else result
+
+
+# A DAG entry: (None, input or constant name, None) for a leaf, or
+# (3x3 table, left entry, right entry) for a gate.
+_Entry = Tuple[Union[None, List[List[int]]], Union[int, str], Union[int, None]]
+
+
+def _on_grid(grid: np.ndarray, support: Tuple[int, ...], target: Tuple[int, ...]):
+    """
+    Re-expresses the grid of an entry over the grid of a wider support.
+
+    A grid lists the 9 values of an entry at 3 * a + b, for the values a
+    and b of the first and second input of its support; an entry of one
+    input only depends on a, one of none is constant.
+    """
+    if len(support) == 1 and support[0] != target[0]:
+        return np.tile(grid[::3], 3)
+    return grid
+
+
+def _compile_entries(
+    entries: Sequence[_Entry], outputs: Sequence[int], inputs: Sequence[str]
+) -> CompiledCircuit:
+    """
+    Compiles a DAG of entries, listed operands first, into lookups.
+
+    Every entry is first evaluated on the grid of values of the (at most
+    two) inputs it depends on; only the entries that depend on more inputs
+    become gate instructions, on the registers of their operands.
+    """
+    inputs = list(inputs)
+    zero = len(inputs)
+    input_grid = np.repeat(np.arange(3, dtype=np.uint8), 3)
+    # supports[e] is the sorted tuple of the input registers entry e depends
+    # on, and grids[e] its grid if there are at most two of them.
+    supports, grids = [], []
+    for table, left, right in entries:
+        if table is None:
+            if left in CONSTANTS:
+                supports.append(())
+                grids.append(np.full(9, int(left), dtype=np.uint8))
+            elif left in inputs:
+                supports.append((inputs.index(left),))
+                grids.append(input_grid)
+            else:
+                raise ValueError(f"Unknown input {left!r}: expected one of {inputs}.")
+            continue
+        support = tuple(sorted(set(supports[left]) | set(supports[right])))
+        supports.append(support)
+        if len(support) > 2:
+            grids.append(None)
+        else:
+            grids.append(
+                np.asarray(table, dtype=np.uint8)[
+                    _on_grid(grids[left], supports[left], support),
+                    _on_grid(grids[right], supports[right], support),
+                ]
+            )
+
+    # Only the entries on a path from an output down to the first entries
+    # of at most two inputs are needed.
+    needed, stack = set(), list(outputs)
+    while stack:
+        entry = stack.pop()
+        if entry not in needed:
+            needed.add(entry)
+            if len(supports[entry]) > 2:
+                stack.extend(entries[entry][1:])
+
+    tables, lefts, rights = [], [], []
+    registers = {}
+    for entry in sorted(needed):
+        table, left, right = entries[entry]
+        support = supports[entry]
+        if table is None and support:
+            registers[entry] = support[0]
+            continue
+        if len(support) > 2:
+            tables.append(np.asarray(table, dtype=np.uint8).ravel())
+            lefts.append(registers[left])
+            rights.append(registers[right])
+        else:
+            padded = support + (zero, zero)
+            tables.append(grids[entry])
+            lefts.append(padded[0])
+            rights.append(padded[1])
+        registers[entry] = zero + len(tables)
+    return CompiledCircuit(
+        inputs,
+        np.array(tables, dtype=np.uint8).reshape(-1, 9),
+        lefts,
+        rights,
+        [registers[entry] for entry in outputs],
+    )
+
+
+def compile_formulas(
+    formulas: Sequence[Union[str, Dict]],
+    inputs: Sequence[str] = DEFAULT_INPUTS,
+    gates: Dict[str, List[List[int]]] = None,
+) -> CompiledCircuit:
+    """
+    Compiles formulas into one circuit with an output per formula.
+
+    Args:
+        formulas: Formula strings like "TAND(x, TAND(y, 0))" or nested
+            {"op": ..., "left": ..., "right": ...} trees. Equal
+            subexpressions are only computed once.
+        inputs: The names of the inputs, in the column order of the values.
+            Leaves other than these must be the constants 0, 1 and 2.
+        gates: The 3x3 table of each op name; by default only TAND. Give
+            other gates to simulate chains of them, e.g.
+            {"G0042": store.table(42)}.
+    """
+    gates = {"TAND": TAND_TABLE} if gates is None else gates
+    entries, index = [], {}
+
+    def intern(key, entry: _Entry) -> int:
+        if key not in index:
+            index[key] = len(entries)
+            entries.append(entry)
+        return index[key]
+
+    outputs = []
+    for formula in formulas:
+        if isinstance(formula, str):
+            formula = parse_formula(formula)
+        # Iterative post-order walk, so deep formulas never hit the
+        # recursion limit.
+        done = {}
+        stack = [formula]
+        while stack:
+            node = stack[-1]
+            if isinstance(node, (str, int)):
+                done[id(node)] = intern(str(node), (None, str(node), None))
+                stack.pop()
+                continue
+            children = [node["left"], node["right"]]
+            pending = [child for child in children if id(child) not in done]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            if node["op"] not in gates:
+                raise ValueError(f"Unknown gate {node['op']!r} in formula.")
+            left, right = (done[id(child)] for child in children)
+            done[id(node)] = intern(
+                (node["op"], left, right), (gates[node["op"]], left, right)
+            )
+        outputs.append(done[id(formula)])
+    return _compile_entries(entries, outputs, inputs)
+
+
+def compile_store_nodes(
+    store: ExpressionStore, nodes: Sequence[int], inputs: Sequence[str] = DEFAULT_INPUTS
+) -> CompiledCircuit:
+    """Compiles nodes of an expression store, sharing its subexpressions."""
+    reached, stack = set(), list(nodes)
+    while stack:
+        node = stack.pop()
+        if node not in reached:
+            reached.add(node)
+            if not store.is_leaf(node):
+                stack.extend((store.left[node], store.right[node]))
+    # A node is created after its operands, so node order lists them first.
+    order = sorted(reached)
+    entry_of = {node: entry for entry, node in enumerate(order)}
+    entries = [
+        (None, store.leaves[store.right[node]], None)
+        if store.is_leaf(node)
+        else (
+            store.basis[store.gate[node]][1],
+            entry_of[store.left[node]],
+            entry_of[store.right[node]],
+        )
+        for node in order
+    ]
+    return _compile_entries(entries, [entry_of[node] for node in nodes], inputs)
+
+
+def compile_program(
+    program: Sequence[Tuple[str, str, str]],
+    outputs: Sequence[str],
+    inputs: Sequence[str] = DEFAULT_INPUTS,
+) -> CompiledCircuit:
+    """
+    Compiles a straight-line TAND program, as returned by
+    circuit_search.synthesize_circuit.
+
+    Args:
+        program: The (name, left, right) steps: name = TAND(left, right).
+        outputs: The names of the steps or leaves to output.
+    """
+    entries, entry_of = [], {}
+    for name in list(inputs) + list(CONSTANTS):
+        entry_of[name] = len(entries)
+        entries.append((None, name, None))
+    for name, left, right in program:
+        entry_of[name] = len(entries)
+        entries.append((TAND_TABLE, entry_of[left], entry_of[right]))
+    return _compile_entries(entries, [entry_of[name] for name in outputs], inputs)
+
+
+def compile_gates(
+    gate_ids: Sequence[int], store_path: str = GATE_STORE_FILE
+) -> CompiledCircuit:
+    """Compiles the stored formulas of gates of the gate store into one circuit."""
+    store = GateStore.open(store_path)
+    formulas = []
+    for gate_id in gate_ids:
+        formula = store.formula(gate_id)
+        if formula is None:
+            raise ValueError(f"Gate {gate_id} has no formula in {store_path}.")
+        formulas.append(formula)
+    return compile_formulas(formulas)
+
+
+def simulate_file(
+    circuit: CompiledCircuit,
+    inputs_path: str,
+    output_path: str,
+    chunk_size: int = CHUNK_SIZE,
+) -> int:
+    """
+    Streams input vectors from a .npy file through a circuit.
+
+    The (N, I) uint8 inputs are memory-mapped and the (N, O) uint8 outputs
+    are written to a memory-mapped .npy file, one chunk at a time, so
+    neither has to fit in memory.
+
+    Returns:
+        The number of rows simulated.
+    """
+    values = np.load(inputs_path, mmap_mode="r")
+    if values.ndim != 2 or values.shape[1] != len(circuit.inputs):
+        raise ValueError(
+            f"{inputs_path} holds an array of shape {values.shape}, expected "
+            f"(N, {len(circuit.inputs)}) for inputs {circuit.inputs}."
+        )
+    tmp_path = f"{output_path}.tmp"
+    out = np.lib.format.open_memmap(
+        tmp_path, mode="w+", dtype=np.uint8, shape=(len(values), len(circuit.outputs))
+    )
+    circuit.run(values, out, chunk_size)
+    out.flush()
+    del out
+    os.replace(tmp_path, output_path)
+    return len(values)
+
+
+def main():
+    """Simulates stored gate formulas or given formulas on a file of inputs."""
+    parser = argparse.ArgumentParser(
+        description="Evaluate TAND formulas on a .npy file of input vectors."
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        "--gate", type=int, nargs="+", metavar="ID", help="stored formulas to simulate"
+    )
+    source.add_argument(
+        "--formula", nargs="+", help='formulas to simulate, e.g. "TAND(x, y)"'
+    )
+    parser.add_argument(
+        "--inputs",
+        required=True,
+        help="(N, 2) uint8 .npy file of x and y values, read memory-mapped",
+    )
+    parser.add_argument(
+        "--output", required=True, help="(N, outputs) uint8 .npy file to write"
+    )
+    parser.add_argument(
+        "--store",
+        default=GATE_STORE_FILE,
+        help=f"gate store to read with --gate (default: {GATE_STORE_FILE})",
+    )
+    args = parser.parse_args()
+
+    if args.gate:
+        circuit = compile_gates(args.gate, args.store)
+    else:
+        circuit = compile_formulas(args.formula)
+    rows = simulate_file(circuit, args.inputs, args.output)
+    print(
+        f"Simulated {rows:,} input vectors through {len(circuit.outputs)} "
+        f"outputs ({len(circuit)} lookups) into {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
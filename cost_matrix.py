@@ -0,0 +1,172 @@
+"""
+Minimal costs of building functions from a basis, and the gate cost matrix.
+
+closure_costs finds the fewest basis gate applications that build each of
+the 3**9 binary ternary functions, keeping only costs and no expressions.
+compute_cost_matrix runs it with every gate of the store as a one-gate basis
+to find how cheaply each gate builds every other one.
+"""
+
+import itertools
+import multiprocessing
+import os
+from typing import Tuple
+
+import numpy as np
+
+import find_tand_representations as finder
+from executors import create_pool
+from gate_store import GATE_STORE_FILE, GateStore
+
+COST_MATRIX_FILE = "cost_matrix.npy"
+# Cost matrix entry of a gate that a basis cannot build.
+UNREACHABLE = 255
+
+
+def closure_costs(weights: np.ndarray, targets: np.ndarray = None) -> np.ndarray:
+    """
+    Computes the fewest basis gate applications that build each function.
+
+    This is the layered closure of the minimal search without its
+    expressions: each layer composes whole earlier layers at once, block by
+    block, and only keeps the cost of every newly reached function id.
+
+    Args:
+        weights: The finder.basis_weights of the basis.
+        targets: Function ids to stop at once all of them have a cost. By
+            default the closure runs until nothing new is reachable.
+
+    Returns:
+        A uint8 array with the cost of every function id, UNREACHABLE for the
+        functions the basis cannot build.
+    """
+    costs = np.full(finder.NUM_FUNCTIONS, UNREACHABLE, dtype=np.uint8)
+    base_ids = np.unique(
+        [
+            finder.flat_to_id(finder.expr_to_flat_table(e))
+            for e in finder.BASE_EXPRESSIONS
+        ]
+    )
+    costs[base_ids] = 0
+    layers = [base_ids]
+
+    for cost in range(1, UNREACHABLE):
+        if targets is not None and (costs[targets] < UNREACHABLE).all():
+            break
+        top_cost = max(c for c, layer in enumerate(layers) if len(layer))
+        if cost - 1 > 2 * top_cost:
+            break
+        new_ids = []
+        for left_cost in range(cost):
+            left_ids, right_ids = layers[left_cost], layers[cost - 1 - left_cost]
+            if not len(left_ids) or not len(right_ids):
+                continue
+            right_tables = finder.ALL_TABLES[right_ids]
+            rows_per_block = max(
+                1, finder.BLOCK_SIZE // (len(right_ids) * len(weights))
+            )
+            for row in range(0, len(left_ids), rows_per_block):
+                left_tables = finder.ALL_TABLES[left_ids[row : row + rows_per_block]]
+                for gate_weights in weights:
+                    ids = finder.compose_tables(left_tables, right_tables, gate_weights)
+                    ids = ids[costs[ids] == UNREACHABLE]
+                    if ids.size:
+                        ids = np.unique(ids)
+                        costs[ids] = cost
+                        new_ids.append(ids)
+        layers.append(
+            np.concatenate(new_ids) if new_ids else np.empty(0, dtype=np.int64)
+        )
+    return costs
+
+
+def _conjugation_maps() -> np.ndarray:
+    """
+    Returns how relabeling the values 0, 1, 2 acts on function ids.
+
+    Row p maps the id of every function f to the id of
+    perm(f(inverse(a), inverse(b))), for the p-th permutation of (0, 1, 2).
+    Relabeling a basis relabels everything it builds the same way, and the
+    leaves x, y, 0, 1, 2 are mapped to leaves, so costs are invariant.
+    """
+    maps = []
+    for perm in itertools.permutations(range(3)):
+        perm = np.array(perm)
+        inverse = np.argsort(perm)
+        positions = (inverse[:, None] * 3 + inverse[None, :]).ravel()
+        maps.append(
+            perm[finder.ALL_TABLES[:, positions]].astype(np.int32) @ finder.ID_POWERS
+        )
+    return np.array(maps)
+
+
+def _representative_costs(task: Tuple[int, np.ndarray]) -> np.ndarray:
+    """Worker function: closure_costs of the single-gate basis with this id."""
+    func_id, targets = task
+    basis = [("", finder.ALL_TABLES[func_id].reshape(3, 3).tolist())]
+    return closure_costs(finder.basis_weights(basis), targets)
+
+
+def compute_cost_matrix(
+    store_path: str = GATE_STORE_FILE,
+    path: str = COST_MATRIX_FILE,
+    cpu_count: int = None,
+    executor: str = None,
+) -> np.ndarray:
+    """
+    Computes how cheaply every gate builds every other gate, and saves it.
+
+    Entry [b, g] of the matrix is the fewest applications of gate b (with the
+    inputs and constants as leaves) that build gate g, or UNREACHABLE. Costs
+    do not change when a basis has its inputs swapped, and relabeling the
+    values of a basis relabels its costs, so one closure per symmetry class
+    of gates is enough: every other row is a permutation of its class row.
+
+    The matrix is saved as a uint8 .npy file, which np.load can memory-map.
+    The closures run on workers of the given executor (see
+    executors.create_pool).
+    """
+    records = GateStore.open(store_path).records
+    gate_ids = records["func_id"].astype(np.int64)
+    conjugations = _conjugation_maps()
+    swapped = finder.ALL_TABLES[:, [3 * b + a for a in range(3) for b in range(3)]]
+    swapped = swapped.astype(np.int32) @ finder.ID_POWERS
+
+    # The representative of gate b is the smallest id among its relabelings,
+    # with and without its inputs swapped; candidate k relabels with
+    # permutation k % 6, so cost_b(g) = cost_representative(relabel_k(g)).
+    candidates = np.concatenate(
+        [conjugations[:, gate_ids], conjugations[:, swapped[gate_ids]]]
+    ).T
+    representatives = candidates.min(axis=1)
+    relabelings = candidates.argmin(axis=1) % len(conjugations)
+    unique_representatives = np.unique(representatives)
+    targets = np.unique(conjugations[:, gate_ids])
+
+    cpu_count = cpu_count or multiprocessing.cpu_count()
+    print(
+        f"Computing closures of {len(unique_representatives)} symmetry classes "
+        f"for {len(gate_ids)} basis gates on {cpu_count} workers..."
+    )
+    class_costs = {}
+    with create_pool(executor, cpu_count) as pool:
+        tasks = [(int(func_id), targets) for func_id in unique_representatives]
+        for done, costs in enumerate(pool.imap(_representative_costs, tasks), 1):
+            class_costs[int(unique_representatives[done - 1])] = costs
+            if done % 50 == 0 or done == len(tasks):
+                print(f"  {done}/{len(tasks)} closures done")
+
+    matrix = np.empty((len(gate_ids), len(gate_ids)), dtype=np.uint8)
+    for basis_gate, (representative, relabel) in enumerate(
+        zip(representatives.tolist(), relabelings.tolist())
+    ):
+        matrix[basis_gate] = class_costs[representative][
+            conjugations[relabel][gate_ids]
+        ]
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, matrix)
+    os.replace(tmp_path, path)
+    print(f"Saved the {len(gate_ids)}x{len(gate_ids)} cost matrix to {path}")
+    return matrix
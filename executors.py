@@ -0,0 +1,117 @@
+"""
+Worker pools for the search and enumeration scripts.
+
+Every parallel step runs on a pool created by create_pool, which is one of:
+
+- "processes": a multiprocessing.Pool. Each worker has its own interpreter,
+  so arguments and results are pickled, and large state has to go through
+  shared memory.
+- "threads": a multiprocessing.pool.ThreadPool. Workers share the address
+  space, so they read the caller's arrays directly. On a free-threaded
+  (GIL-disabled) CPython build the threads run in parallel.
+- "serial": runs every task in the calling thread, for debugging and
+  profiling.
+
+All three have the map, imap and starmap methods of multiprocessing.Pool.
+"""
+
+import multiprocessing
+import os
+import sys
+import threading
+from multiprocessing.pool import ThreadPool
+from typing import Callable, Iterable, List, Sequence
+
+EXECUTORS = ("serial", "processes", "threads")
+AUTO = "auto"
+
+
+def gil_enabled() -> bool:
+    """True unless this is a free-threaded CPython running without the GIL."""
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return True if is_gil_enabled is None else is_gil_enabled()
+
+
+def resolve_executor(executor: str = None) -> str:
+    """
+    Returns the executor to use for a requested one.
+
+    None or "auto" pick threads when the GIL is disabled and processes
+    otherwise.
+    """
+    if executor in (None, AUTO):
+        return "processes" if gil_enabled() else "threads"
+    if executor not in EXECUTORS:
+        raise ValueError(
+            f"Unknown executor {executor!r}; expected one of {', '.join(EXECUTORS)}."
+        )
+    return executor
+
+
+def worker_id() -> int:
+    """Identifies the calling worker: its pid in a worker process, else its thread."""
+    if multiprocessing.parent_process() is not None:
+        return os.getpid()
+    return threading.get_ident()
+
+
+class SerialPool:
+    """A stand-in for multiprocessing.Pool that runs tasks in the caller."""
+
+    def __init__(self, initializer: Callable = None, initargs: Sequence = ()):
+        if initializer is not None:
+            initializer(*initargs)
+
+    def map(self, function: Callable, iterable: Iterable) -> List:
+        return [function(item) for item in iterable]
+
+    def imap(self, function: Callable, iterable: Iterable) -> Iterable:
+        return (function(item) for item in iterable)
+
+    imap_unordered = imap
+
+    def starmap(self, function: Callable, iterable: Iterable) -> List:
+        return [function(*args) for args in iterable]
+
+    def close(self):
+        pass
+
+    def join(self):
+        pass
+
+    def terminate(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+def create_pool(
+    executor: str,
+    workers: int,
+    initializer: Callable = None,
+    initargs: Sequence = (),
+):
+    """
+    Creates a pool of the given executor (see resolve_executor).
+
+    Args:
+        executor: "serial", "processes", "threads", "auto" or None.
+        workers: The number of worker processes or threads.
+        initializer: If given, called with initargs in every worker (once in
+            the caller for "serial").
+
+    Returns:
+        A pool with the interface of multiprocessing.Pool.
+    """
+    executor = resolve_executor(executor)
+    if executor == "processes":
+        return multiprocessing.Pool(
+            processes=workers, initializer=initializer, initargs=initargs
+        )
+    if executor == "threads":
+        return ThreadPool(workers, initializer=initializer, initargs=initargs)
+    return SerialPool(initializer, initargs)
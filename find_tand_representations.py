@@ -1,13 +1,62 @@
-import json
+import argparse
+import functools
 import multiprocessing
 import os
-from functools import partial
-from typing import Dict, List, Tuple, Union
+import pickle
+import sys
+import time
+from array import array
+from multiprocessing import shared_memory
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+import circuit_search
+import cost_matrix
+import targeted_search
+from gate_store import (
+    FRONT_SIZE,
+    GATE_STORE_FILE,
+    NO_FORMULA,
+    WEB_DATA_DIR,
+    GateStore,
+    export_web_data,
+)
+from executors import EXECUTORS, create_pool, resolve_executor, worker_id
+from metrics import Metrics, add_arguments, peak_rss_bytes
 
 
 TAND_TABLE = [[1, 2, 2], [2, 2, 2], [2, 2, 0]]
 NUM_GATES = 3774
+NUM_FUNCTIONS = 3 ** 9
 BASE_EXPRESSIONS = ["x", "y", "0", "1", "2"]
+CATALOG_FILE = "tand_catalog.npz"
+CHECKPOINT_FILE = "tand_search_checkpoint.npz"
+# Operation count of a function no expression has reached yet.
+NO_COST = np.iinfo(np.int32).max
+
+# Number of (left, right) pairs composed per NumPy block inside a worker.
+BLOCK_SIZE = 1 << 20
+
+TAND_ARRAY = np.array(TAND_TABLE, dtype=np.uint8)
+ID_POWERS = 3 ** np.arange(8, -1, -1, dtype=np.int32)
+# ALL_TABLES[func_id] is the flat truth table with that base-3 id.
+ALL_TABLES = (
+    (np.arange(NUM_FUNCTIONS, dtype=np.int32)[:, None] // ID_POWERS) % 3
+).astype(np.uint8)
+# TAND_WEIGHTS[i, 3 * a + b] is TAND(a, b) already scaled by the power of 3 of
+# table position i, so a composed id is the sum of nine gathers.
+TAND_WEIGHTS = ID_POWERS[:, None] * TAND_ARRAY.ravel()[None, :].astype(np.int32)
+# A basis is a list of (name, 3x3 table) pairs: the gates a search may apply.
+TAND_BASIS = [("TAND", TAND_TABLE)]
+# TRANSPOSED_IDS[func_id] is the id of f(y, x) for the function f(x, y).
+TRANSPOSED_IDS = ALL_TABLES[:, [0, 3, 6, 1, 4, 7, 2, 5, 8]].astype(np.int32) @ ID_POWERS
+# In a symmetric search, row TRANSPOSED_OFFSET + i of the known tables holds
+# the transpose of row i.
+TRANSPOSED_OFFSET = NUM_FUNCTIONS
+KNOWN_ROWS = TRANSPOSED_OFFSET + NUM_FUNCTIONS
+# Row strips a triangle of operand pairs is covered with (see _triangle_regions).
+TRIANGLE_STRIPS = 16
 
 
 def evaluate_tand(a: int, b: int) -> int:
@@ -51,230 +100,1648 @@ def expr_to_flat_table(expr: Union[str, Dict]) -> List[int]:
     ]
 
 
-def expr_to_string(expr: Union[str, Dict]) -> str:
-    """Converts an expression tree to a human-readable string."""
-    if isinstance(expr, str):
-        return expr
-    else:
-        left_str = expr_to_string(expr["left"])
-        right_str = expr_to_string(expr["right"])
-        return f"TAND({left_str}, {right_str})"
+def flat_to_id(flat: Sequence[int]) -> int:
+    """Encodes a 9-element flat truth table as its base-3 function id (0..19682)."""
+    func_id = 0
+    for value in flat:
+        func_id = func_id * 3 + int(value)
+    return func_id
 
 
-def count_tand_operations(expr: Union[str, Dict]) -> int:
-    """Recursively counts the number of TAND operations in an expression."""
-    if isinstance(expr, str):
-        return 0
-    else:
-        return 1 + count_tand_operations(
-            expr["left"]) + count_tand_operations(expr["right"])
+def id_to_flat(func_id: int) -> List[int]:
+    """Decodes a base-3 function id back into its 9-element flat truth table."""
+    return [(int(func_id) // int(power)) % 3 for power in ID_POWERS]
+
+
+def basis_weights(basis: Sequence[Tuple[str, List[List[int]]]]) -> np.ndarray:
+    """
+    Returns the stacked TAND_WEIGHTS-style weights of every gate of a basis.
+
+    Returns:
+        A (G, 9, 9) int32 array whose [g, i, 3 * a + b] entry is gate g applied
+        to (a, b), scaled by the power of 3 of table position i.
+    """
+    tables = np.array([table for _, table in basis], dtype=np.int32).reshape(-1, 9)
+    return ID_POWERS[None, :, None] * tables[:, None, :]
+
+
+def compose_tables(
+    left_tables: np.ndarray,
+    right_tables: np.ndarray,
+    weights: np.ndarray = TAND_WEIGHTS,
+) -> np.ndarray:
+    """
+    Composes every left table with every right table through TAND.
+
+    Each result costs 9 gathers from the TAND table, one per truth table
+    position, reduced to a function id by the powers of 3 folded into
+    TAND_WEIGHTS, so no intermediate (L, R, 9) array is materialized.
+
+    Args:
+        left_tables: An (L, 9) uint8 array of flat truth tables.
+        right_tables: An (R, 9) uint8 array of flat truth tables.
+        weights: The (9, 9) weights of another gate to compose through
+            instead of TAND (one entry of basis_weights).
+
+    Returns:
+        An (L, R) int32 array with the function id of each TAND(left, right).
+    """
+    left_codes = left_tables.T.astype(np.intp) * 3
+    right_codes = right_tables.T.astype(np.intp)
+    func_ids = weights[0][left_codes[0][:, None] + right_codes[0][None, :]]
+    for i in range(1, 9):
+        func_ids += weights[i][left_codes[i][:, None] + right_codes[i][None, :]]
+    return func_ids
+
+
+def is_commutative(basis: Sequence[Tuple[str, List[List[int]]]]) -> bool:
+    """True if every gate of the basis gives the same for (a, b) and (b, a)."""
+    return all(
+        np.array_equal(np.array(table), np.array(table).T) for _, table in basis
+    )
+
+
+class ExpressionStore:
+    """
+    A hash-consed store of TAND expressions.
+
+    Each node is a (left_id, right_id) pair of node ids kept in parallel
+    integer arrays, so a subexpression is stored once however many
+    expressions share it. Leaves are interned once and marked with a left id
+    of -1, their right id indexing `leaves`. With a basis of several gates,
+    `gate` holds the basis index of the gate each node applies. Op counts
+    and depths are filled in when a node is created; strings and JSON trees
+    are built on demand, iteratively, so deep expressions never hit the
+    recursion limit.
+    """
+
+    def __init__(
+        self,
+        leaves: Sequence[str] = BASE_EXPRESSIONS,
+        basis: Sequence[Tuple[str, List[List[int]]]] = TAND_BASIS,
+    ):
+        self.leaves = list(leaves)
+        self.basis = [(name, [list(row) for row in table]) for name, table in basis]
+        self.left = array("i")
+        self.right = array("i")
+        self.gate = array("B")
+        self.operations = array("q")
+        self.depth = array("i")
+        self._index = {}
+        self._swapped = {}
+        for leaf_index in range(len(self.leaves)):
+            self._add(-1, leaf_index, 0, 0)
+
+    def __len__(self) -> int:
+        return len(self.left)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Returns the store as plain NumPy arrays, e.g. for np.savez."""
+        return {
+            "leaves": np.array(self.leaves),
+            "basis_names": np.array([name for name, _ in self.basis]),
+            "basis_tables": np.array(
+                [table for _, table in self.basis], dtype=np.uint8
+            ),
+            "left": np.frombuffer(self.left, dtype=np.int32),
+            "right": np.frombuffer(self.right, dtype=np.int32),
+            "gate": np.frombuffer(self.gate, dtype=np.uint8),
+            "operations": np.frombuffer(self.operations, dtype=np.int64),
+            "depth": np.frombuffer(self.depth, dtype=np.int32),
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays) -> "ExpressionStore":
+        """Rebuilds a store from the arrays written by to_arrays."""
+        if "basis_names" in arrays:
+            basis = list(
+                zip(
+                    [str(name) for name in arrays["basis_names"]],
+                    arrays["basis_tables"].tolist(),
+                )
+            )
+            gates = arrays["gate"].astype(np.uint8)
+        else:
+            # Written before bases were pluggable: every node is a TAND.
+            basis = TAND_BASIS
+            gates = np.zeros(len(arrays["left"]), dtype=np.uint8)
+        store = cls([str(leaf) for leaf in arrays["leaves"]], basis)
+        store.left = array("i", arrays["left"].astype(np.int32).tobytes())
+        store.right = array("i", arrays["right"].astype(np.int32).tobytes())
+        store.gate = array("B", gates.tobytes())
+        store.operations = array("q", arrays["operations"].astype(np.int64).tobytes())
+        store.depth = array("i", arrays["depth"].astype(np.int32).tobytes())
+        store._index = {
+            (gate, left, right): node
+            for node, (gate, left, right) in enumerate(
+                zip(store.gate, store.left, store.right)
+            )
+        }
+        return store
+
+    def _add(
+        self, left: int, right: int, operations: int, depth: int, gate: int = 0
+    ) -> int:
+        node = len(self.left)
+        self.left.append(left)
+        self.right.append(right)
+        self.gate.append(gate)
+        self.operations.append(operations)
+        self.depth.append(depth)
+        self._index[(gate, left, right)] = node
+        return node
+
+    def leaf(self, name: str) -> int:
+        """Returns the node id of the leaf `name` ("x", "y", "0", "1" or "2")."""
+        return self._index[(0, -1, self.leaves.index(name))]
+
+    def tand(self, left: int, right: int) -> int:
+        """Returns the node id of TAND(left, right), creating it if needed."""
+        return self.apply(0, left, right)
+
+    def apply(self, gate: int, left: int, right: int) -> int:
+        """Returns the node id of basis gate `gate` applied to (left, right)."""
+        node = self._index.get((gate, left, right))
+        if node is None:
+            node = self._add(
+                left,
+                right,
+                1 + self.operations[left] + self.operations[right],
+                1 + max(self.depth[left], self.depth[right]),
+                gate,
+            )
+        return node
+
+    def is_leaf(self, node: int) -> bool:
+        return self.left[node] < 0
+
+    def swap_inputs(self, node: int) -> int:
+        """
+        Returns the node of the expression with x and y swapped.
+
+        It computes f(y, x) for a node computing f(x, y), with the same op
+        count and depth. Results are cached for the lifetime of the store.
+        """
+        swapped_leaves = {"x": "y", "y": "x"}
+        return self._fold(
+            node,
+            lambda leaf: self.leaf(swapped_leaves.get(leaf, leaf)),
+            self.apply,
+            self._swapped,
+        )
+
+    def _fold(self, node: int, on_leaf, on_gate, memo: Dict[int, object]):
+        """Evaluates a node bottom-up with an explicit stack, memoizing by id."""
+        stack = [node]
+        while stack:
+            current = stack[-1]
+            if current in memo:
+                stack.pop()
+                continue
+            left, right = self.left[current], self.right[current]
+            if left < 0:
+                memo[current] = on_leaf(self.leaves[right])
+                stack.pop()
+            elif left in memo and right in memo:
+                memo[current] = on_gate(
+                    self.gate[current], memo[left], memo[right]
+                )
+                stack.pop()
+            else:
+                stack.extend(child for child in (right, left) if child not in memo)
+        return memo[node]
+
+    def to_string(self, node: int, memo: Dict[int, str] = None) -> str:
+        """Builds the human-readable string of a node, e.g. "TAND(x, 0)"."""
+        return self._fold(
+            node,
+            lambda leaf: leaf,
+            lambda gate, left, right: f"{self.basis[gate][0]}({left}, {right})",
+            {} if memo is None else memo,
+        )
+
+    def to_tree(self, node: int, memo: Dict[int, object] = None) -> Union[str, Dict]:
+        """Builds the nested {"op": "TAND", ...} tree of a node for JSON output."""
+        return self._fold(
+            node,
+            lambda leaf: leaf,
+            lambda gate, left, right: {
+                "op": self.basis[gate][0],
+                "left": left,
+                "right": right,
+            },
+            {} if memo is None else memo,
+        )
+
+    def to_flat_table(self, node: int, memo: Dict[int, Tuple] = None) -> List[int]:
+        """Computes the 9-element flat truth table of a node."""
+        leaf_tables = {
+            leaf: tuple(expr_to_flat_table(leaf)) for leaf in self.leaves
+        }
+        table = self._fold(
+            node,
+            leaf_tables.__getitem__,
+            lambda gate, left, right: tuple(
+                self.basis[gate][1][a][b] for a, b in zip(left, right)
+            ),
+            {} if memo is None else memo,
+        )
+        return list(table)
 
 
 def _process_chunk(
-    left_expr_chunk: List, all_exprs: List, seen_tables_keys: set
-) -> List[Tuple]:
+    task: Tuple[int, int, int, int],
+    known_tables: np.ndarray,
+    seen: np.ndarray,
+    weights: np.ndarray = TAND_WEIGHTS[None],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
     """
     Worker function for multiprocessing.
 
-    Generates all new, unique truth tables from a given chunk of expressions.
+    Composes a contiguous range of known tables (as the "left" operand) with
+    a contiguous range of known tables (as the "right" operand), block by
+    block, and keeps the first pair that produces each function id not seen
+    before.
 
     Args:
-        left_expr_chunk: A subset of expressions to use as the "left" operand.
-        all_exprs: The full list of all known expressions to use as the "right" operand.
-        seen_tables_keys: A set of all previously seen truth tables to avoid duplicates.
+        task: The (left_start, left_stop, right_start, right_stop) indices of
+            the operands in known_tables.
+        known_tables: A (K, 9) uint8 array of all known flat truth tables.
+        seen: A boolean array of length NUM_FUNCTIONS marking seen function ids.
+        weights: The basis_weights of the gates to compose through. Within a
+            block, pairs through earlier gates of the basis come first.
 
     Returns:
-        A list of tuples, where each is (flat_tuple, new_expr).
+        A tuple of (func_ids, left_indices, right_indices, gates) arrays, in
+        the order the pairs were first encountered.
     """
-    results = []
-    local_seen = set()
+    left_start, left_stop, right_start, right_stop = task
+    right_tables = known_tables[right_start:right_stop]
+    right_count = len(right_tables)
+    rows_per_block = max(1, BLOCK_SIZE // max(1, right_count * len(weights)))
+    local_seen = seen.copy()
+    found_ids, found_left, found_right, found_gates = [], [], [], []
+
+    for row in range(left_start, left_stop, rows_per_block):
+        row_stop = min(left_stop, row + rows_per_block)
+        left_tables = known_tables[row:row_stop]
+        ids = np.concatenate(
+            [
+                compose_tables(left_tables, right_tables, gate_weights).ravel()
+                for gate_weights in weights
+            ]
+        )
+        positions = np.flatnonzero(~local_seen[ids])
+        if positions.size == 0:
+            continue
+        _, first = np.unique(ids[positions], return_index=True)
+        positions = np.sort(positions[first])
+        func_ids = ids[positions]
+        local_seen[func_ids] = True
+
+        gates, pairs = np.divmod(positions, (row_stop - row) * right_count)
+        left, right = np.divmod(pairs, right_count)
+        found_ids.append(func_ids)
+        found_left.append(left + row)
+        found_right.append(right + right_start)
+        found_gates.append(gates)
+
+    if not found_ids:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty, empty
+    return (
+        np.concatenate(found_ids),
+        np.concatenate(found_left),
+        np.concatenate(found_right),
+        np.concatenate(found_gates),
+    )
 
-    for left_expr in left_expr_chunk:
-        for right_expr in all_exprs:
-            new_expr = {"op": "TAND", "left": left_expr, "right": right_expr}
-            flat_table = expr_to_flat_table(new_expr)
-            flat_tuple = tuple(flat_table)
 
-            if flat_tuple not in seen_tables_keys and flat_tuple not in local_seen:
-                local_seen.add(flat_tuple)
-                results.append((flat_tuple, new_expr))
-    return results
+def _triangle_regions(start: int, stop: int) -> List[Tuple[int, int, int, int]]:
+    """
+    Covers the pairs (i, j) with start <= i <= j < stop with row strips.
 
+    Each strip of rows [r, s) is paired with the rows [r, stop), so only the
+    pairs below the diagonal inside each strip (about 1 / TRIANGLE_STRIPS of
+    the triangle) are composed needlessly.
+    """
+    rows_per_strip = max(1, -(-(stop - start) // TRIANGLE_STRIPS))
+    return [
+        (row, min(stop, row + rows_per_strip), row, stop)
+        for row in range(start, stop, rows_per_strip)
+    ]
 
-def _run_parallel_search(
-    all_exprs: List, seen_tables: Dict, cpu_count: int
-) -> List[Tuple]:
+
+def _symmetric_regions(
+    regions: List[Tuple[int, int, int, int]]
+) -> List[Tuple[int, int, int, int]]:
     """
-    Manages the parallel execution for a single depth level.
+    Adds, for every region, the same region against the transposed rows.
 
-    Splits the work, runs it on a pool of workers, and gathers results.
+    In a symmetric search the known rows hold one function per transpose
+    class. Since gate(a, b) transposed is gate(a', b') (' being the
+    transpose), composing every left row with every right row and its
+    transpose reaches every class of new functions.
     """
-    chunk_size = max(1, (len(all_exprs) + cpu_count - 1) // cpu_count)
-    chunks = [
-        all_exprs[i:i + chunk_size] for i in range(0, len(all_exprs), chunk_size)
+    return regions + [
+        (
+            left_start,
+            left_stop,
+            TRANSPOSED_OFFSET + right_start,
+            TRANSPOSED_OFFSET + right_stop,
+        )
+        for left_start, left_stop, right_start, right_stop in regions
     ]
-    seen_keys = set(seen_tables.keys())
 
-    worker_func = partial(
-        _process_chunk, all_exprs=all_exprs, seen_tables_keys=seen_keys
+
+def _frontier_regions(
+    known_count: int,
+    frontier_start: int,
+    symmetric: bool = False,
+    commutative: bool = False,
+) -> List[Tuple[int, int, int, int]]:
+    """
+    Returns the operand regions worth composing at the next depth.
+
+    Only pairs with at least one operand in the frontier (rows from
+    frontier_start onwards) can produce a table that was not seen at an
+    earlier depth: those are old x new and new x all. Regions are listed in
+    the same row-major order as the full search, so the first pair found
+    for each table is the same with or without the frontier.
+
+    With symmetric=True the rows hold one function per transpose class and
+    are also composed with the transposed rows (see _symmetric_regions). If
+    the basis is also commutative, gate(a, b') and gate(b, a') are
+    transposes of each other, so only pairs with a <= b are needed: new x
+    old is skipped and new x new is cut to a triangle.
+    """
+    regions = []
+    if frontier_start > 0:
+        regions.append((0, frontier_start, frontier_start, known_count))
+    if symmetric and commutative:
+        regions += _triangle_regions(frontier_start, known_count)
+    else:
+        regions.append((frontier_start, known_count, 0, known_count))
+    return _symmetric_regions(regions) if symmetric else regions
+
+
+def _cost_regions(
+    layer_bounds: List[int],
+    cost: int,
+    symmetric: bool = False,
+    commutative: bool = False,
+) -> List[Tuple[int, int, int, int]]:
+    """
+    Returns the operand regions that build expressions with exactly `cost`
+    TAND operations.
+
+    layer_bounds[c] is the first row of the layer of tables whose minimal
+    cost is c, so a layer k expression is TAND(a, b) with a taken from layer
+    i and b from layer k - 1 - i. With symmetric=True the regions are also
+    composed with the transposed rows, and a commutative basis only needs
+    left layers no costlier than right ones (see _frontier_regions).
+    """
+    regions = []
+    for left_cost in range(cost):
+        right_cost = cost - 1 - left_cost
+        if symmetric and commutative and left_cost > right_cost:
+            break
+        left_start, left_stop = layer_bounds[left_cost], layer_bounds[left_cost + 1]
+        right_start, right_stop = (
+            layer_bounds[right_cost],
+            layer_bounds[right_cost + 1],
+        )
+        if left_stop <= left_start or right_stop <= right_start:
+            continue
+        if symmetric and commutative and left_cost == right_cost:
+            regions += _triangle_regions(left_start, left_stop)
+        else:
+            regions.append((left_start, left_stop, right_start, right_stop))
+    return _symmetric_regions(regions) if symmetric else regions
+
+
+def _split_tasks(
+    regions: List[Tuple[int, int, int, int]], cpu_count: int
+) -> List[Tuple[int, int, int, int]]:
+    """Splits operand regions into row-aligned tasks of roughly equal size."""
+    total_pairs = sum(
+        (left_stop - left_start) * (right_stop - right_start)
+        for left_start, left_stop, right_start, right_stop in regions
     )
-    print(
-        f"Distributing {len(all_exprs)**2:,} combinations across {cpu_count} workers..."
+    pairs_per_task = max(1, (total_pairs + cpu_count - 1) // cpu_count)
+
+    tasks = []
+    for left_start, left_stop, right_start, right_stop in regions:
+        rows_per_task = max(1, pairs_per_task // max(1, right_stop - right_start))
+        for row in range(left_start, left_stop, rows_per_task):
+            tasks.append(
+                (row, min(left_stop, row + rows_per_task), right_start, right_stop)
+            )
+    return tasks
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """
+    Attaches to an existing shared memory block without taking ownership.
+
+    Only the process that created the block unlinks it. Before Python 3.13
+    there is no `track` argument, but pool workers share the parent's
+    resource tracker, so registering the block again there is harmless.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+# Worker-side views of the search state, set up once per worker process.
+_worker_memory = []
+_worker_tables = None
+_worker_seen = None
+_worker_weights = None
+
+
+def _init_worker(tables_name: str, seen_name: str, weights: np.ndarray):
+    """Pool initializer: maps the shared known tables and seen bitmap."""
+    global _worker_tables, _worker_seen, _worker_weights
+    _worker_weights = weights
+    tables_shm = _attach_shared_memory(tables_name)
+    seen_shm = _attach_shared_memory(seen_name)
+    _worker_memory.extend([tables_shm, seen_shm])
+    _worker_tables = np.ndarray((KNOWN_ROWS, 9), dtype=np.uint8, buffer=tables_shm.buf)
+    _worker_seen = np.ndarray((NUM_FUNCTIONS,), dtype=bool, buffer=seen_shm.buf)
+
+
+def _process_compact_chunk(
+    task: Tuple[int, int, int, int],
+    known_tables: np.ndarray,
+    seen: np.ndarray,
+    weights: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, Tuple]:
+    """
+    Runs _process_chunk and returns compact int32 arrays.
+
+    The last element is (worker id, seconds spent, worker peak RSS bytes),
+    for the per-worker metrics of _run_parallel_search.
+    """
+    start = time.perf_counter()
+    func_ids, lefts, rights, gates = _process_chunk(task, known_tables, seen, weights)
+    return (
+        func_ids.astype(np.int32),
+        lefts.astype(np.int32),
+        rights.astype(np.int32),
+        gates.astype(np.uint8),
+        (worker_id(), time.perf_counter() - start, peak_rss_bytes()),
     )
 
-    with multiprocessing.Pool(processes=cpu_count) as pool:
-        results_from_workers = pool.map(worker_func, chunks)
 
-    return [item for sublist in results_from_workers for item in sublist]
+def _process_shared_chunk(
+    task: Tuple[int, int, int, int]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, Tuple]:
+    """Runs _process_compact_chunk on the shared state of a worker process."""
+    return _process_compact_chunk(
+        task, _worker_tables, _worker_seen, _worker_weights
+    )
 
 
-def _load_gates() -> Dict[int, Dict]:
-    """Loads all gate JSON files from the 'gates' directory."""
-    print("Loading all gate files...")
-    gates = {}
-    for i in range(NUM_GATES):
-        filename = f"gates/gate_{i:04d}.json"
-        try:
-            with open(filename, "r") as f:
-                gate_data = json.load(f)
-                gates[i] = {
-                    "flat": gate_data["flat"],
-                    "gate_id": i,
-                    "found": False,
-                }
-        except FileNotFoundError:
-            print(f"Warning: Gate file not found: {filename}")
-            continue
+class _SearchPool:
+    """
+    A worker pool that lives for a whole search.
+
+    With worker processes, the known tables (at most one row per function
+    id) and the seen bitmap are kept in shared memory, so workers attach to
+    them once at startup and each depth only sends small task tuples and
+    receives compact arrays. With threads (or serially) the workers read the
+    same arrays directly. Either way, every task returns its own arrays and
+    the caller merges them, so workers never write shared state.
+
+    Row TRANSPOSED_OFFSET + i of the known tables always holds the transpose
+    of row i. In a symmetric search, the rows hold one function of each
+    transpose class and the seen bitmap marks both.
+    """
+
+    def __init__(
+        self,
+        cpu_count: int,
+        weights: np.ndarray = TAND_WEIGHTS[None],
+        executor: str = None,
+        symmetric: bool = False,
+    ):
+        self.cpu_count = cpu_count
+        self.executor = resolve_executor(executor)
+        self.weights = weights
+        self.symmetric = symmetric
+        self._shared_memory = []
+        if self.executor == "processes":
+            self._tables_shm = shared_memory.SharedMemory(
+                create=True, size=KNOWN_ROWS * 9
+            )
+            self._seen_shm = shared_memory.SharedMemory(
+                create=True, size=NUM_FUNCTIONS
+            )
+            self._shared_memory = [self._tables_shm, self._seen_shm]
+            self.known_tables = np.ndarray(
+                (KNOWN_ROWS, 9), dtype=np.uint8, buffer=self._tables_shm.buf
+            )
+            self.seen = np.ndarray(
+                (NUM_FUNCTIONS,), dtype=bool, buffer=self._seen_shm.buf
+            )
+            self.known_tables[:] = 0
+            self.seen[:] = False
+            self._pool = create_pool(
+                self.executor,
+                cpu_count,
+                initializer=_init_worker,
+                initargs=(self._tables_shm.name, self._seen_shm.name, weights),
+            )
+        else:
+            self.known_tables = np.zeros((KNOWN_ROWS, 9), dtype=np.uint8)
+            self.seen = np.zeros(NUM_FUNCTIONS, dtype=bool)
+            self._pool = create_pool(self.executor, cpu_count)
+        self.known_count = 0
+
+    def add_functions(self, func_ids: Sequence[int]):
+        """
+        Appends the tables of new function ids and marks them as seen.
+
+        In a symmetric search their transposes are marked as seen too.
+        """
+        if not func_ids:
+            return
+        stop = self.known_count + len(func_ids)
+        self.known_tables[self.known_count:stop] = ALL_TABLES[func_ids]
+        self.known_tables[
+            TRANSPOSED_OFFSET + self.known_count:TRANSPOSED_OFFSET + stop
+        ] = ALL_TABLES[TRANSPOSED_IDS[func_ids]]
+        self.seen[func_ids] = True
+        if self.symmetric:
+            self.seen[TRANSPOSED_IDS[func_ids]] = True
+        self.known_count = stop
+
+    def function_count(self) -> int:
+        """The number of functions known, counting transposes when symmetric."""
+        return int(np.count_nonzero(self.seen))
+
+    def map(self, tasks: List[Tuple[int, int, int, int]]) -> List[Tuple]:
+        """Runs the tasks on the workers against the current shared state."""
+        if self.executor == "processes":
+            return self._pool.map(_process_shared_chunk, tasks)
+        return self._pool.map(
+            functools.partial(
+                _process_compact_chunk,
+                known_tables=self.known_tables,
+                seen=self.seen,
+                weights=self.weights,
+            ),
+            tasks,
+        )
+
+    def close(self):
+        """Stops the workers and releases the shared memory."""
+        self._pool.close()
+        self._pool.join()
+        del self.known_tables, self.seen
+        for shm in self._shared_memory:
+            shm.close()
+            shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _run_parallel_search(
+    search_pool: _SearchPool,
+    regions: List[Tuple[int, int, int, int]],
+    record: Dict = None,
+) -> List[Tuple]:
+    """
+    Manages the parallel execution for a single depth level.
+
+    Splits the work, runs it on the persistent pool of workers, and gathers
+    results. Pairs of known tables outside `regions` are skipped.
+
+    Args:
+        search_pool: The pool holding the known tables.
+        regions: The (left_start, left_stop, right_start, right_stop) blocks
+            of known table pairs to combine.
+        record: If given, filled with the metrics of this level: pairs tried
+            and skipped, tasks, pickled task bytes, result bytes, time spent
+            in the pool and the busy time and peak RSS of every worker.
+
+    Returns:
+        A list of (func_id, left_index, right_index, gate) tuples, where the
+        indices refer to rows of the known tables and gate to the basis.
+    """
+    function_count = search_pool.function_count()
+    cpu_count = search_pool.cpu_count
+    tasks = _split_tasks(regions, cpu_count)
+
+    total_pairs = sum(
+        (left_stop - left_start) * (right_stop - right_start)
+        for left_start, left_stop, right_start, right_stop in tasks
+    )
+    skipped_pairs = function_count**2 - total_pairs
+    print(f"Distributing {total_pairs:,} combinations across {cpu_count} workers...")
+    if skipped_pairs:
+        print(f"Skipping {skipped_pairs:,} combinations that cannot yield new tables.")
+
+    start = time.perf_counter()
+    results_from_workers = search_pool.map(tasks)
+    map_seconds = time.perf_counter() - start
+
+    if record is not None:
+        workers = {}
+        for *arrays, (worker, busy_seconds, worker_rss) in results_from_workers:
+            worker = workers.setdefault(
+                worker, {"worker": worker, "tasks": 0, "busy_seconds": 0.0}
+            )
+            worker["tasks"] += 1
+            worker["busy_seconds"] += busy_seconds
+            worker["peak_rss_bytes"] = worker_rss
+        busy_seconds = sum(worker["busy_seconds"] for worker in workers.values())
+        record.update(
+            pairs_tried=total_pairs,
+            pairs_skipped=skipped_pairs,
+            tasks=len(tasks),
+            task_bytes=sum(len(pickle.dumps(task)) for task in tasks),
+            result_bytes=sum(
+                result.nbytes
+                for arrays in results_from_workers
+                for result in arrays[:4]
+            ),
+            map_seconds=map_seconds,
+            worker_busy_seconds=busy_seconds,
+            worker_utilization=busy_seconds / (map_seconds * cpu_count or 1),
+            executor=search_pool.executor,
+            workers=sorted(workers.values(), key=lambda worker: worker["worker"]),
+        )
+
+    return [
+        (int(func_id), int(left), int(right), int(gate))
+        for func_ids, lefts, rights, gates, _ in results_from_workers
+        for func_id, left, right, gate in zip(func_ids, lefts, rights, gates)
+    ]
+
+
+def _load_gates(store_path: str = GATE_STORE_FILE) -> Dict[int, Dict]:
+    """Loads all gates from the gate store."""
+    print(f"Loading gates from {store_path}...")
+    store = GateStore.open(store_path)
+    gates = {
+        gate_id: {"flat": flat, "gate_id": gate_id, "found": False}
+        for gate_id, flat in enumerate(store.records["flat"].tolist())
+    }
     print(f"Loaded {len(gates)} gates.")
     return gates
 
 
+def _build_gate_index(gates: Dict[int, Dict]) -> array:
+    """Maps every function id to the id of the gate with that table, or -1."""
+    gate_index = array("i", [-1]) * NUM_FUNCTIONS
+    for gate_id, gate_info in gates.items():
+        gate_index[flat_to_id(gate_info["flat"])] = gate_id
+    return gate_index
+
+
+def _record_function(
+    func_id: int,
+    node: int,
+    gates: Dict[int, Dict],
+    gate_index: array,
+    best_node: array,
+) -> int:
+    """
+    Records `node` as the expression for a newly seen `func_id`.
+
+    Returns:
+        1 if this found a gate that had no representation yet, else 0.
+    """
+    best_node[func_id] = node
+    gate_id = gate_index[func_id]
+    if gate_id >= 0 and not gates[gate_id]["found"]:
+        gates[gate_id].update({"found": True, "node": node})
+        return 1
+    return 0
+
+
+def _record_partner(func_id: int, gates: Dict[int, Dict], gate_index: array) -> int:
+    """
+    Marks the gate of the transpose of `func_id`, if any, as found.
+
+    In a symmetric search its expression is only derived after the search,
+    by _add_partners.
+
+    Returns:
+        1 if this found a gate that had no representation yet, else 0.
+    """
+    gate_id = gate_index[TRANSPOSED_IDS[func_id]]
+    if gate_id >= 0 and not gates[gate_id]["found"]:
+        gates[gate_id]["found"] = True
+        return 1
+    return 0
+
+
+def _add_partners(
+    gates: Dict[int, Dict],
+    gate_index: array,
+    best_node: array,
+    store: ExpressionStore,
+):
+    """
+    Gives every transpose left out by a symmetric search its expression.
+
+    The expression of f(y, x) is that of f(x, y) with x and y swapped, so
+    it has the same op count and depth.
+    """
+    for func_id in np.flatnonzero(np.frombuffer(best_node, dtype=np.int32) >= 0):
+        partner = int(TRANSPOSED_IDS[func_id])
+        if best_node[partner] >= 0:
+            continue
+        node = store.swap_inputs(best_node[func_id])
+        best_node[partner] = node
+        gate_id = gate_index[partner]
+        if gate_id >= 0 and "node" not in gates[gate_id]:
+            gates[gate_id].update({"found": True, "node": node})
+
+
 def _process_base_expressions(
-    gates: Dict[int, Dict], seen_tables: Dict, base_exprs: List[str]
+    gates: Dict[int, Dict],
+    gate_index: array,
+    best_node: array,
+    store: ExpressionStore,
+    known_nodes: List[int],
+    symmetric: bool = False,
 ) -> int:
-    """Processes depth 0 expressions and updates any matching gates."""
+    """
+    Processes depth 0 expressions and updates any matching gates.
+
+    With symmetric=True, y is left out as the transpose of x.
+    """
     print("\nProcessing base expressions (depth 0)...")
     found_count = 0
-    for expr in base_exprs:
-        flat_tuple = tuple(expr_to_flat_table(expr))
-        if flat_tuple not in seen_tables:
-            seen_tables[flat_tuple] = expr
-            for gate_info in gates.values():
-                if not gate_info["found"] and gate_info["flat"] == list(flat_tuple):
-                    gate_info.update(
-                        {
-                            "found": True,
-                            "tand_representation": expr,
-                            "tand_string": expr,
-                            "tand_operations": 0,
-                        }
-                    )
-                    found_count += 1
+    for expr in store.leaves:
+        node = store.leaf(expr)
+        func_id = flat_to_id(expr_to_flat_table(expr))
+        if symmetric and best_node[TRANSPOSED_IDS[func_id]] >= 0:
+            continue
+        known_nodes.append(node)
+        if best_node[func_id] < 0:
+            found_count += _record_function(
+                func_id, node, gates, gate_index, best_node
+            )
+            if symmetric:
+                found_count += _record_partner(func_id, gates, gate_index)
     print(f"Depth 0 complete: Found {found_count}/{len(gates)} gates.")
     return found_count
 
 
-def find_tand_representations(max_depth: int = 10):
+def _apply_results(
+    results: List[Tuple],
+    gates: Dict[int, Dict],
+    gate_index: array,
+    best_node: array,
+    store: ExpressionStore,
+    known_nodes: List[int],
+    symmetric: bool = False,
+) -> Tuple[List[int], int]:
+    """
+    Records worker results: interns the expression of every new table and
+    marks the gate it represents, if any, as found.
+
+    With symmetric=True a table whose transpose is already known is
+    skipped, and the gate of the transpose of every new table is marked as
+    found too. Right indices from TRANSPOSED_OFFSET on stand for the known
+    expressions with their inputs swapped.
+
+    Returns:
+        A tuple of (new_func_ids, newly_found_gates), where new_func_ids
+        lists the new functions in the order they were added to known_nodes.
+    """
+    newly_found = 0
+    new_func_ids = []
+
+    for func_id, left, right, gate in results:
+        if best_node[func_id] >= 0:
+            continue
+        if symmetric and best_node[TRANSPOSED_IDS[func_id]] >= 0:
+            continue
+        if right >= TRANSPOSED_OFFSET:
+            right_node = store.swap_inputs(known_nodes[right - TRANSPOSED_OFFSET])
+        else:
+            right_node = known_nodes[right]
+        node = store.apply(gate, known_nodes[left], right_node)
+        known_nodes.append(node)
+        new_func_ids.append(func_id)
+        newly_found += _record_function(func_id, node, gates, gate_index, best_node)
+        if symmetric:
+            newly_found += _record_partner(func_id, gates, gate_index)
+    return new_func_ids, newly_found
+
+
+def _describe_found_gates(gates: Dict[int, Dict], store: ExpressionStore):
+    """Replaces the store node of each found gate with its tree, string and op count."""
+    tree_memo, string_memo = {}, {}
+    for gate_info in gates.values():
+        node = gate_info.pop("node", None)
+        if node is None:
+            continue
+        gate_info.update(
+            {
+                "tand_representation": store.to_tree(node, tree_memo),
+                "tand_string": store.to_string(node, string_memo),
+                "tand_operations": store.operations[node],
+            }
+        )
+
+
+def save_catalog(store: ExpressionStore, best_node: array, path: str = CATALOG_FILE):
+    """
+    Saves the expression of every known function id as one indexed artifact.
+
+    The file holds the expression store arrays plus `roots`, which maps each
+    of the NUM_FUNCTIONS function ids to its node (-1 if unreachable).
+    """
+    roots = np.frombuffer(best_node, dtype=np.int32)
+    np.savez(path, roots=roots, **store.to_arrays())
+    _catalogs.pop(path, None)
+    print(f"Saved {int((roots >= 0).sum()):,} function formulas to {path}")
+
+
+# Loaded catalogs by path, with the modification time they were loaded at.
+_catalogs = {}
+
+
+def load_catalog(path: str = CATALOG_FILE) -> Tuple[ExpressionStore, np.ndarray]:
+    """
+    Loads (and caches) the expression store and roots saved by save_catalog.
+
+    The cached catalog is reloaded when the file has changed since.
+    """
+    mtime = os.stat(path).st_mtime_ns
+    if path not in _catalogs or _catalogs[path][0] != mtime:
+        with np.load(path) as arrays:
+            _catalogs[path] = (
+                mtime,
+                ExpressionStore.from_arrays(arrays),
+                arrays["roots"],
+            )
+    return _catalogs[path][1:]
+
+
+def lookup(flat_table: Sequence[int], path: str = CATALOG_FILE) -> Union[Dict, None]:
+    """
+    Returns the stored TAND formula of any ternary function, without searching.
+
+    Args:
+        flat_table: The 9-element flat truth table of the function.
+        path: The catalog written by find_tand_representations.
+
+    Returns:
+        A dict with the function id, flat table, TAND representation, string
+        and op count, or None if the function is not in the catalog.
+    """
+    store, roots = load_catalog(path)
+    func_id = flat_to_id(flat_table)
+    node = int(roots[func_id])
+    if node < 0:
+        return None
+    return {
+        "func_id": func_id,
+        "flat": list(flat_table),
+        "tand_representation": store.to_tree(node),
+        "tand_string": store.to_string(node),
+        "tand_operations": store.operations[node],
+    }
+
+
+def _save_checkpoint(
+    path: str,
+    level: int,
+    minimal: bool,
+    symmetric: bool,
+    store: ExpressionStore,
+    known_nodes: List[int],
+    known_func_ids: np.ndarray,
+    best_node: array,
+    frontier_start: int,
+    layer_bounds: List[int],
+):
+    """
+    Writes the state of the search after a completed level.
+
+    The checkpoint is written to a temporary file that then replaces the
+    previous one, so a crash mid-write leaves the last level intact.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            level=np.int32(level),
+            minimal=np.bool_(minimal),
+            symmetric=np.bool_(symmetric),
+            known_nodes=np.array(known_nodes, dtype=np.int32),
+            known_func_ids=known_func_ids.astype(np.int32),
+            best_node=np.frombuffer(best_node, dtype=np.int32),
+            frontier_start=np.int32(frontier_start),
+            layer_bounds=np.array(layer_bounds, dtype=np.int32),
+            **store.to_arrays(),
+        )
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _load_checkpoint(path: str, minimal: bool, symmetric: bool) -> Dict:
+    """Reads a checkpoint written by _save_checkpoint into search state."""
+    with np.load(path) as arrays:
+        if bool(arrays["minimal"]) != minimal:
+            mode = "minimal" if arrays["minimal"] else "depth"
+            raise ValueError(f"Checkpoint {path} was written by a {mode} search.")
+        # Checkpoints from before symmetric searches hold every function.
+        written_symmetric = "symmetric" in arrays and bool(arrays["symmetric"])
+        if written_symmetric != symmetric:
+            mode = "symmetric" if written_symmetric else "non-symmetric"
+            raise ValueError(f"Checkpoint {path} was written by a {mode} search.")
+        return {
+            "level": int(arrays["level"]),
+            "store": ExpressionStore.from_arrays(arrays),
+            "known_nodes": arrays["known_nodes"].tolist(),
+            "known_func_ids": arrays["known_func_ids"].tolist(),
+            "best_node": array("i", arrays["best_node"].astype(np.int32).tobytes()),
+            "frontier_start": int(arrays["frontier_start"]),
+            "layer_bounds": arrays["layer_bounds"].tolist(),
+        }
+
+
+def _mark_found_gates(
+    gates: Dict[int, Dict], gate_index: array, best_node: array, symmetric: bool
+) -> int:
+    """
+    Marks every gate whose function already has an expression as found.
+
+    With symmetric=True the gates of their transposes are marked too.
+    """
+    found_count = 0
+    for func_id, gate_id in enumerate(gate_index):
+        if gate_id >= 0 and best_node[func_id] >= 0:
+            gates[gate_id].update({"found": True, "node": best_node[func_id]})
+            found_count += 1
+    if symmetric:
+        for func_id in np.flatnonzero(np.frombuffer(best_node, dtype=np.int32) >= 0):
+            found_count += _record_partner(int(func_id), gates, gate_index)
+    return found_count
+
+
+def _targeted_search(
+    gates: Dict[int, Dict],
+    gate_index: array,
+    best_node: array,
+    store: ExpressionStore,
+    levels: int,
+) -> int:
+    """
+    Looks for the gates a search left unfound with a TargetSearch.
+
+    Returns:
+        The number of gates found.
+    """
+    missing = [
+        gate_id for gate_id, gate_info in gates.items() if not gate_info["found"]
+    ]
+    if not missing:
+        return 0
+    print(
+        f"\nTargeted search for {len(missing)} missing gates, "
+        f"up to {levels} levels past the known expressions..."
+    )
+    search = targeted_search.TargetSearch(store, best_node)
+    found_count = 0
+    for gate_id in missing:
+        flat = gates[gate_id]["flat"]
+        node = search.find(flat, levels)
+        if node is not None:
+            found_count += _record_function(
+                flat_to_id(flat), node, gates, gate_index, best_node
+            )
+    print(f"  > Found {found_count}/{len(missing)} missing gates.")
+    return found_count
+
+
+def find_tand_representations(
+    max_depth: int = 10,
+    frontier: bool = True,
+    minimal: bool = False,
+    max_cost: int = 40,
+    catalog_path: str = None,
+    checkpoint_path: str = None,
+    resume: bool = False,
+    store_path: str = GATE_STORE_FILE,
+    basis: Sequence[Tuple[str, List[List[int]]]] = TAND_BASIS,
+    targeted_levels: int = 0,
+    metrics: Metrics = None,
+    executor: str = None,
+    symmetric: bool = None,
+):
     """
     Finds TAND representations for all gates using a parallel search.
+
+    By default the search goes level by level in nesting depth. With
+    minimal=True it goes level by level in TAND count instead: layer k only
+    combines pairs from layers whose costs add up to k - 1, so every table is
+    first reached by an expression with the fewest possible TAND operations.
+
+    Swapping x and y in an expression for f(x, y) gives one for f(y, x) of
+    the same depth and op count, so a symmetric search keeps one function of
+    each such transpose pair and derives the other's expression at the end.
+    With a commutative basis such as TAND it also composes each unordered
+    pair of known expressions once, which together roughly halves the known
+    expressions and quarters the pairs composed per level. The depths and,
+    with minimal=True, the op counts it finds are the same, but by depth it
+    may keep a formula with more operations than the first one an ordered
+    search reaches, so it is only the default with minimal=True.
+
+    Args:
+        max_depth: The deepest level of TAND nesting to search.
+        frontier: If True, each depth only combines the expressions found at
+            the previous depth with all known expressions (semi-naive
+            expansion). If False, every known pair is recombined.
+        minimal: If True, search by TAND count rather than by depth.
+        max_cost: The largest TAND count to search when minimal is True.
+        catalog_path: If given, keep searching after every gate is found,
+            until the closure of all reachable functions is complete, and
+            save the formula of every function there (see save_catalog).
+        checkpoint_path: If given, the search state is saved there after
+            every completed level.
+        resume: If True and checkpoint_path exists, continue from the last
+            completed level instead of starting from the base expressions.
+            max_depth or max_cost may be raised between runs.
+        store_path: The gate store written by generate_gates.py.
+        basis: The (name, 3x3 table) gates expressions are built from; each
+            application of any of them costs one operation (see parse_basis).
+        targeted_levels: If positive, the gates still missing after the
+            search are looked for with a meet-in-the-middle search (see
+            targeted_search.TargetSearch) up to this many levels past the
+            known expressions. Those formulas are not guaranteed to be the
+            shallowest or smallest.
+        metrics: If given, receives a load_gates record, a search_level record
+            per level (see _run_parallel_search for its worker fields) and
+            targeted_search and save_catalog records.
+        executor: How the workers run: "processes", "threads" or "serial"
+            (see executors.create_pool). By default threads when the GIL is
+            disabled and processes otherwise.
+        symmetric: If True, search one function of each transpose pair and
+            compose each unordered pair once; if False, search every
+            function on its own and compose every ordered pair. Defaults to
+            minimal.
     """
-    gates = _load_gates()
+    metrics = metrics or Metrics()
+    if symmetric is None:
+        symmetric = minimal
+    with metrics.phase("load_gates", store=store_path) as record:
+        gates = _load_gates(store_path)
+        record["gates"] = len(gates)
     if not gates:
         return {}
 
-    seen_tables = {}
-    all_exprs = list(BASE_EXPRESSIONS)
-    found_count = _process_base_expressions(gates, seen_tables, all_exprs)
+    gate_index = _build_gate_index(gates)
+    if resume and checkpoint_path and os.path.exists(checkpoint_path):
+        state = _load_checkpoint(checkpoint_path, minimal, symmetric)
+        store = state["store"]
+        if store.basis != ExpressionStore(basis=basis).basis:
+            raise ValueError(
+                f"Checkpoint {checkpoint_path} was written with basis "
+                f"{[name for name, _ in store.basis]}."
+            )
+        known_nodes = state["known_nodes"]
+        known_func_ids = state["known_func_ids"]
+        best_node = state["best_node"]
+        frontier_start = state["frontier_start"]
+        layer_bounds = state["layer_bounds"]
+        first_level = state["level"] + 1
+        found_count = _mark_found_gates(gates, gate_index, best_node, symmetric)
+        print(
+            f"\nResumed from {checkpoint_path} after level {state['level']}: "
+            f"{len(known_nodes):,} expressions, {found_count}/{len(gates)} gates."
+        )
+    else:
+        best_node = array("i", [-1]) * NUM_FUNCTIONS
+        store = ExpressionStore(basis=basis)
+        known_nodes = []
+        found_count = _process_base_expressions(
+            gates, gate_index, best_node, store, known_nodes, symmetric
+        )
+        known_func_ids = [
+            flat_to_id(store.to_flat_table(node)) for node in known_nodes
+        ]
+        frontier_start = 0
+        layer_bounds = [0, len(known_nodes)]
+        first_level = 1
+
+    level_name = "Cost" if minimal else "Depth"
+    max_level = max_cost if minimal else max_depth
+    commutative = is_commutative(basis)
 
     cpu_count = multiprocessing.cpu_count()
-    print(f"\nUsing {cpu_count} CPU cores for parallel search.")
+    executor = resolve_executor(executor)
+    print(f"\nUsing {cpu_count} CPU cores ({executor}) for parallel search.")
+
+    with _SearchPool(
+        cpu_count, basis_weights(basis), executor, symmetric
+    ) as search_pool:
+        search_pool.add_functions(known_func_ids)
+
+        for level in range(first_level, max_level + 1):
+            if found_count >= len(gates) and catalog_path is None:
+                print("\nAll gates found. Stopping search.")
+                break
+
+            if minimal:
+                regions = _cost_regions(layer_bounds, level, symmetric, commutative)
+                top_cost = max(
+                    cost
+                    for cost in range(len(layer_bounds) - 1)
+                    if layer_bounds[cost + 1] > layer_bounds[cost]
+                )
+                if level - 1 > 2 * top_cost:
+                    print("\nNo larger expressions can be built. Search complete.")
+                    break
+            else:
+                regions = _frontier_regions(
+                    search_pool.known_count, frontier_start, symmetric, commutative
+                )
+
+            print(f"\n--- Starting {level_name} {level} ---")
+            print(f"Building from {len(known_nodes):,} unique expressions...")
+
+            with metrics.phase(
+                "search_level",
+                mode=level_name.lower(),
+                level=level,
+                known_expressions=len(known_nodes),
+                known_functions=search_pool.function_count(),
+                symmetric=symmetric,
+                cpu_count=cpu_count,
+            ) as record:
+                newly_found_results = _run_parallel_search(
+                    search_pool, regions, record
+                )
+                new_func_ids, newly_found_this_depth = _apply_results(
+                    newly_found_results,
+                    gates,
+                    gate_index,
+                    best_node,
+                    store,
+                    known_nodes,
+                    symmetric,
+                )
+                found_count += newly_found_this_depth
+
+                if frontier:
+                    frontier_start = search_pool.known_count
+                search_pool.add_functions(new_func_ids)
+                if minimal:
+                    layer_bounds.append(search_pool.known_count)
+
+                print(f"{level_name} {level} complete.")
+                if newly_found_this_depth > 0:
+                    print(
+                        f"  > Found {newly_found_this_depth} new gates "
+                        f"this {level_name.lower()}."
+                    )
+                print(f"  > Total found: {found_count}/{len(gates)}")
+                print(f"  > New unique expressions discovered: {len(new_func_ids)}")
+                print(f"  > Total unique expressions known: {len(known_nodes):,}")
+                record.update(
+                    candidates=len(newly_found_results),
+                    new_tables=len(new_func_ids),
+                    new_gates=newly_found_this_depth,
+                    found_gates=found_count,
+                )
+
+                if checkpoint_path:
+                    start = time.perf_counter()
+                    _save_checkpoint(
+                        checkpoint_path,
+                        level,
+                        minimal,
+                        symmetric,
+                        store,
+                        known_nodes,
+                        search_pool.known_tables[: search_pool.known_count].dot(
+                            ID_POWERS
+                        ),
+                        best_node,
+                        frontier_start,
+                        layer_bounds,
+                    )
+                    record["checkpoint_seconds"] = time.perf_counter() - start
+                    record["checkpoint_bytes"] = os.path.getsize(checkpoint_path)
+
+            if search_pool.function_count() >= NUM_FUNCTIONS:
+                print("\nEvery function has been found. Search complete.")
+                break
+            if not newly_found_results and not minimal:
+                print("\nNo new expressions generated. Search complete.")
+                break
+
+    if symmetric:
+        _add_partners(gates, gate_index, best_node, store)
+    if targeted_levels > 0:
+        with metrics.phase("targeted_search", levels=targeted_levels) as record:
+            record["new_gates"] = _targeted_search(
+                gates, gate_index, best_node, store, targeted_levels
+            )
+    if catalog_path is not None:
+        with metrics.phase("save_catalog", path=catalog_path) as record:
+            save_catalog(store, best_node, catalog_path)
+            record["bytes_written"] = os.path.getsize(catalog_path)
+    _describe_found_gates(gates, store)
+    print(f"\nSearch finished!")
+    print(f"  > Expression store holds {len(store):,} nodes.")
+    return gates
 
-    for depth in range(1, max_depth + 1):
-        if found_count >= len(gates):
-            print("\nAll gates found. Stopping search.")
-            break
 
-        print(f"\n--- Starting Depth {depth} ---")
-        print(f"Building from {len(all_exprs):,} unique expressions...")
+def _front_chunk(
+    task: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Worker function: composes some left operands with all right operands and
+    keeps the cheapest pair of each function id that beats its known cost.
 
-        newly_found_results = _run_parallel_search(all_exprs, seen_tables, cpu_count)
+    Args:
+        task: The (left_ids, right_ids, costs, weights) of the block, where
+            costs holds the fewest operations of every function id so far
+            (NO_COST if unreached) and weights the basis_weights.
 
-        new_expressions_this_depth = 0
-        newly_found_this_depth = 0
-        unfound_gates = {
-            gid: g for gid, g in gates.items() if not g["found"]
-        }
+    Returns:
+        A tuple of (func_ids, costs, left_ids, right_ids, gates) arrays.
+    """
+    left_ids, right_ids, costs, weights = task
+    right_tables = ALL_TABLES[right_ids]
+    right_costs = costs[right_ids]
+    rows_per_block = max(1, BLOCK_SIZE // len(right_ids))
+    found = []
+    for row in range(0, len(left_ids), rows_per_block):
+        block_ids = left_ids[row : row + rows_per_block]
+        pair_costs = costs[block_ids][:, None] + right_costs[None, :] + 1
+        for gate, gate_weights in enumerate(weights):
+            func_ids = compose_tables(ALL_TABLES[block_ids], right_tables, gate_weights)
+            lefts, rights = np.nonzero(pair_costs < costs[func_ids])
+            if lefts.size:
+                found.append(
+                    (
+                        func_ids[lefts, rights],
+                        pair_costs[lefts, rights],
+                        block_ids[lefts],
+                        right_ids[rights],
+                        np.full(lefts.size, gate),
+                    )
+                )
+    if not found:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty, empty, empty
+    return _cheapest(*[np.concatenate(column) for column in zip(*found)])
+
+
+def _cheapest(
+    func_ids: np.ndarray, *columns: np.ndarray
+) -> Tuple[np.ndarray, ...]:
+    """Keeps the first cheapest row of each function id; columns[0] is the cost."""
+    order = np.lexsort((columns[0], func_ids))
+    _, first = np.unique(func_ids[order], return_index=True)
+    keep = order[first]
+    return (func_ids[keep],) + tuple(column[keep] for column in columns)
+
+
+def pareto_fronts(
+    max_depth: int = 10,
+    basis: Sequence[Tuple[str, List[List[int]]]] = TAND_BASIS,
+    cpu_count: int = None,
+    executor: str = None,
+) -> Tuple[ExpressionStore, np.ndarray]:
+    """
+    Finds, for every function id, the expressions that are not beaten in
+    both depth and operation count by another.
 
-        for flat_tuple, new_expr in newly_found_results:
-            if flat_tuple not in seen_tables:
-                new_expressions_this_depth += 1
-                seen_tables[flat_tuple] = new_expr
-                all_exprs.append(new_expr)
-
-                for gate_info in unfound_gates.values():
-                    if gate_info["flat"] == list(flat_tuple):
-                        gate_info.update(
-                            {
-                                "found": True,
-                                "tand_representation": new_expr,
-                                "tand_string": expr_to_string(new_expr),
-                                "tand_operations": count_tand_operations(new_expr),
-                            }
-                        )
-                        found_count += 1
-                        newly_found_this_depth += 1
-
-        print(f"Depth {depth} complete.")
-        if newly_found_this_depth > 0:
-            print(f"  > Found {newly_found_this_depth} new gates this depth.")
-        print(f"  > Total found: {found_count}/{len(gates)}")
-        print(f"  > New unique expressions discovered: {new_expressions_this_depth}")
-        print(f"  > Total unique expressions known: {len(all_exprs):,}")
-
-        if not newly_found_results:
-            print("\nNo new expressions generated. Search complete.")
-            break
+    Level d keeps the fewest operations of each function among expressions
+    of depth at most d: the cheapest gate(a, b) over operands of level d - 1.
+    A function's Pareto front is the levels where that count drops. Only
+    pairs with an operand whose count dropped at the previous level can
+    lower a count, so each level only composes those.
 
-    print(f"\nSearch finished!")
-    return gates
+    Args:
+        max_depth: The deepest expressions to consider.
+        basis: The (name, 3x3 table) gates expressions are built from.
+        cpu_count: The number of workers (default: all cores).
+        executor: "processes", "threads" or "serial" (see
+            executors.create_pool; default: threads without the GIL).
 
+    Returns:
+        The expression store and an (NUM_FUNCTIONS, FRONT_SIZE) int32 array
+        of the front of each function id, as store nodes by increasing depth
+        and decreasing operation count, padded with -1. A front longer than
+        FRONT_SIZE keeps its shallowest points and its cheapest one.
+    """
+    weights = basis_weights(basis)
+    store = ExpressionStore(basis=basis)
+    costs = np.full(NUM_FUNCTIONS, NO_COST, dtype=np.int64)
+    nodes = np.full(NUM_FUNCTIONS, -1, dtype=np.int64)
+    fronts = np.full((NUM_FUNCTIONS, FRONT_SIZE), -1, dtype=np.int32)
+    sizes = np.zeros(NUM_FUNCTIONS, dtype=np.int32)
+    for leaf in store.leaves:
+        func_id = flat_to_id(expr_to_flat_table(leaf))
+        costs[func_id] = 0
+        nodes[func_id] = fronts[func_id, 0] = store.leaf(leaf)
+        sizes[func_id] = 1
+    changed = np.flatnonzero(nodes >= 0)
+
+    cpu_count = cpu_count or multiprocessing.cpu_count()
+    print(f"\nComputing Pareto fronts up to depth {max_depth} on {cpu_count} workers...")
+    with create_pool(executor, cpu_count) as pool:
+        for depth in range(1, max_depth + 1):
+            known = np.flatnonzero(nodes >= 0)
+            tasks = [
+                (left_ids, right_ids, costs, weights)
+                for all_left, right_ids in (
+                    (changed, known),
+                    (np.setdiff1d(known, changed), changed),
+                )
+                for left_ids in np.array_split(all_left, 4 * cpu_count)
+                if len(left_ids) and len(right_ids)
+            ]
+            results = pool.map(_front_chunk, tasks)
+            func_ids, new_costs, lefts, rights, gates = _cheapest(
+                *[np.concatenate(column) for column in zip(*results)]
+            )
+            new_nodes = [
+                store.apply(gate, nodes[left], nodes[right])
+                for gate, left, right in zip(
+                    gates.tolist(), lefts.tolist(), rights.tolist()
+                )
+            ]
+            costs[func_ids] = new_costs
+            nodes[func_ids] = new_nodes
+            fronts[func_ids, np.minimum(sizes[func_ids], FRONT_SIZE - 1)] = new_nodes
+            sizes[func_ids] = np.minimum(sizes[func_ids] + 1, FRONT_SIZE)
+            changed = func_ids
+            print(
+                f"  Depth {depth}: {len(changed):,} functions got cheaper, "
+                f"{int((nodes >= 0).sum()):,} reached"
+            )
+            if not len(changed):
+                break
+    return store, fronts
+
+
+def find_pareto_fronts(
+    max_depth: int = 10,
+    store_path: str = GATE_STORE_FILE,
+    basis: Sequence[Tuple[str, List[List[int]]]] = TAND_BASIS,
+    executor: str = None,
+    metrics: Metrics = None,
+) -> Dict[int, Dict]:
+    """
+    Finds the Pareto front of (depth, operations) formulas of every gate.
 
-def update_gate_files(gates: Dict):
-    """Updates all gate JSON files with their TAND representations."""
-    print("\nUpdating gate files with TAND representations...")
-    updated_count = 0
-    not_found_count = 0
+    Args:
+        metrics: If given, receives a load_gates record and a pareto_fronts
+            record with the number of gates that have a front.
 
-    for gate_id, gate_info in gates.items():
-        filename = f"gates/gate_{gate_id:04d}.json"
-        try:
-            with open(filename, "r") as f:
-                gate_data = json.load(f)
-
-            if gate_info.get("found"):
-                gate_data["tand_representation"] = gate_info["tand_representation"]
-                gate_data["tand_string"] = gate_info["tand_string"]
-                gate_data["tand_operations"] = gate_info["tand_operations"]
-                updated_count += 1
-            else:
-                gate_data["tand_representation"] = None
-                gate_data["tand_string"] = "Not found within search depth"
-                gate_data["tand_operations"] = None
-                not_found_count += 1
+    Returns:
+        The gates like find_tand_representations, with the shallowest
+        formula as the representation and a "front" list of the
+        {"depth", "tand_operations", "tand_string"} of every Pareto point.
+    """
+    metrics = metrics or Metrics()
+    with metrics.phase("load_gates", store=store_path) as record:
+        gates = _load_gates(store_path)
+        record["gates"] = len(gates)
+    with metrics.phase("pareto_fronts", max_depth=max_depth) as record:
+        store, fronts = pareto_fronts(max_depth, basis, executor=executor)
+        string_memo = {}
+        for gate_info in gates.values():
+            front = [
+                node
+                for node in fronts[flat_to_id(gate_info["flat"])].tolist()
+                if node >= 0
+            ]
+            if not front:
+                continue
+            gate_info.update(
+                {
+                    "found": True,
+                    "node": front[0],
+                    "front": [
+                        {
+                            "depth": store.depth[node],
+                            "tand_operations": store.operations[node],
+                            "tand_string": store.to_string(node, string_memo),
+                        }
+                        for node in front
+                    ],
+                }
+            )
+        record["found"] = sum(gate_info["found"] for gate_info in gates.values())
+        record["store_nodes"] = len(store)
+    _describe_found_gates(gates, store)
+    print(f"  > Expression store holds {len(store):,} nodes.")
+    return gates
 
-            with open(filename, "w") as f:
-                json.dump(gate_data, f, indent=2)
 
-            if (gate_id + 1) % 500 == 0:
-                print(f"  Updated {gate_id + 1}/{len(gates)} files...")
+def parse_basis(
+    specs: Sequence[str], store_path: str = GATE_STORE_FILE
+) -> List[Tuple[str, List[List[int]]]]:
+    """
+    Builds a basis from gate specs given on the command line.
 
-        except FileNotFoundError:
-            print(f"Warning: Could not update non-existent file: {filename}")
-            continue
+    Each spec is "TAND", a gate id of the gate store (named like "G0042"), or
+    a 9-digit flat truth table (named like "F122222220").
+    """
+    basis = []
+    for spec in specs:
+        if spec.upper() == "TAND":
+            basis.append(("TAND", TAND_TABLE))
+        elif len(spec) == 9 and set(spec) <= set("012"):
+            table = [[int(value) for value in spec[row : row + 3]] for row in (0, 3, 6)]
+            basis.append((f"F{spec}", table))
+        elif spec.isdigit():
+            gate_id = int(spec)
+            store = GateStore.open(store_path)
+            if gate_id >= len(store):
+                raise ValueError(f"Gate {gate_id} is not in {store_path}.")
+            basis.append((f"G{gate_id:04d}", store.table(gate_id)))
+        else:
+            raise ValueError(
+                f"Invalid basis gate {spec!r}: expected TAND, a gate id or "
+                "a 9-digit flat truth table."
+            )
+    return basis
+
+
+def update_gate_store(
+    gates: Dict, store_path: str = GATE_STORE_FILE, metrics: Metrics = None
+):
+    """
+    Writes the TAND representations of all gates to the gate store at once.
+
+    Args:
+        gates: The gates returned by find_tand_representations.
+        store_path: The gate store to update.
+        metrics: If given, receives an update_gate_store record with the
+            read and write times and the bytes written.
+    """
+    metrics = metrics or Metrics()
+    with metrics.phase("update_gate_store", store=store_path) as record:
+        _update_gate_store(gates, store_path, record)
+
+
+def _update_gate_store(gates: Dict, store_path: str, record: Dict):
+    """Does the work of update_gate_store and fills its metrics record."""
+    print(f"\nUpdating {store_path} with TAND representations...")
+    start = time.perf_counter()
+    store = GateStore.open(store_path)
+    record["read_seconds"] = time.perf_counter() - start
+    found = [gates.get(gate_id, {}).get("found") for gate_id in range(len(store))]
+    fronts = None
+    if any("front" in gate_info for gate_info in gates.values()):
+        fronts = [
+            [
+                (point["depth"], point["tand_operations"], point["tand_string"])
+                for point in gates.get(gate_id, {}).get("front", [])
+            ]
+            for gate_id in range(len(store))
+        ]
+    store = store.with_formulas(
+        [
+            gates[gate_id]["tand_operations"] if is_found else NO_FORMULA
+            for gate_id, is_found in enumerate(found)
+        ],
+        [
+            gates[gate_id]["tand_string"] if is_found else None
+            for gate_id, is_found in enumerate(found)
+        ],
+        fronts,
+    )
+    start = time.perf_counter()
+    store.save(store_path)
+    record["write_seconds"] = time.perf_counter() - start
+    record["bytes_written"] = os.path.getsize(store_path)
 
+    updated_count = sum(1 for is_found in found if is_found)
+    record["gates_found"] = updated_count
     print(f"\nUpdate complete!")
     print(f"  > Gates with TAND representations: {updated_count}")
-    print(f"  > Gates not found: {not_found_count}")
+    print(f"  > Gates not found: {len(found) - updated_count}")
+
+
+_LEAF_TABLES = {leaf: tuple(expr_to_flat_table(leaf)) for leaf in BASE_EXPRESSIONS}
+
+
+def _evaluate_formula(text: str) -> Tuple[Tuple[int, ...], int, int]:
+    """
+    Evaluates a formula string on all nine inputs without building its tree.
+
+    Each leaf pushes its flat table and each closing parenthesis replaces
+    the top two tables with their TAND, so the formula is read once, left
+    to right, with no recursion however deep it is.
+
+    Returns:
+        A tuple of the flat table, the TAND count and the depth.
+
+    Raises:
+        ValueError: If the formula is malformed.
+    """
+    tokens = text.replace("(", " ( ").replace(")", " ) ").replace(",", " ").split()
+    stack = []
+    operations = 0
+    try:
+        for token in tokens:
+            if token in ("TAND", "("):
+                continue
+            if token == ")":
+                right, right_depth = stack.pop()
+                left, left_depth = stack.pop()
+                stack.append(
+                    (
+                        tuple(TAND_TABLE[a][b] for a, b in zip(left, right)),
+                        1 + max(left_depth, right_depth),
+                    )
+                )
+                operations += 1
+            else:
+                stack.append((_LEAF_TABLES[token], 0))
+    except (IndexError, KeyError):
+        stack = []
+    if len(stack) != 1 or tokens.count("TAND") != operations:
+        raise ValueError(f"Malformed formula: {text!r}")
+    table, depth = stack[0]
+    return table, operations, depth
+
+
+def verify_gate_store(store_path: str = GATE_STORE_FILE) -> Dict[str, List]:
+    """
+    Checks every formula of the gate store against its gate.
+
+    Each formula, and each point of the stored Pareto fronts, is evaluated
+    on all nine inputs and compared with the gate's flat table, and its
+    TAND count and depth with the stored ones.
+
+    Returns:
+        A dict of problems, each a list of (gate_id, description) pairs:
+        "mismatches" (wrong table or malformed formula), "missing" (no
+        formula after a search) and "costs" (stored TAND count or depth
+        differs from the formula, or a front that is not a Pareto front).
+    """
+    store = GateStore.open(store_path)
+    records = store.records
+    flats = records["flat"].tolist()
+    problems = {"mismatches": [], "missing": [], "costs": []}
+
+    func_ids = records["flat"].astype(np.int64) @ ID_POWERS.astype(np.int64)
+    for gate_id in np.flatnonzero(func_ids != records["func_id"]).tolist():
+        problems["mismatches"].append((gate_id, "function id does not match flat"))
+
+    def check(gate_id: int, formula: str, operations: int, depth: int = None):
+        try:
+            table, formula_operations, formula_depth = _evaluate_formula(formula)
+        except ValueError as error:
+            problems["mismatches"].append((gate_id, str(error)))
+            return
+        if list(table) != flats[gate_id]:
+            problems["mismatches"].append(
+                (gate_id, f"{formula} computes {list(table)}")
+            )
+        if formula_operations != operations:
+            problems["costs"].append(
+                (gate_id, f"{formula_operations} TAND operations, stored {operations}")
+            )
+        if depth is not None and formula_depth != depth:
+            problems["costs"].append(
+                (gate_id, f"depth {formula_depth}, stored {depth}")
+            )
+
+    operations = records["operations"].tolist()
+    for gate_id in range(len(store)):
+        formula = store.formula(gate_id)
+        if formula is None:
+            if store.searched:
+                problems["missing"].append((gate_id, "no formula"))
+        else:
+            check(gate_id, formula, operations[gate_id])
+        front = store.front(gate_id)
+        for depth, front_operations, front_formula in front:
+            check(gate_id, front_formula, front_operations, depth)
+        for (depth, ops, _), (next_depth, next_ops, _) in zip(front, front[1:]):
+            if next_depth <= depth or next_ops >= ops:
+                description = (
+                    f"front point ({next_depth}, {next_ops}) is dominated by "
+                    f"or equal to ({depth}, {ops})"
+                )
+                problems["costs"].append((gate_id, description))
+    return problems
 
 
 def print_statistics(gates: Dict):
@@ -310,24 +1777,311 @@ def print_statistics(gates: Dict):
         print(f"  {gates[1886]['tand_string']}")
 
 
+def _parse_args() -> argparse.Namespace:
+    """Parses the command line options of the finder."""
+    parser = argparse.ArgumentParser(
+        description="Find TAND representations for all universal ternary gates."
+    )
+    parser.add_argument(
+        "--max-depth",
+        type=int,
+        default=8,
+        help="deepest level of TAND nesting to search (default: 8)",
+    )
+    parser.add_argument(
+        "--minimal",
+        action="store_true",
+        help="search by TAND count so every formula uses the fewest TAND gates",
+    )
+    parser.add_argument(
+        "--pareto",
+        action="store_true",
+        help=(
+            "keep every formula that no other beats in both depth and TAND "
+            "count, up to --max-depth, and store these fronts with the gates"
+        ),
+    )
+    parser.add_argument(
+        "--symmetry",
+        dest="symmetric",
+        action="store_true",
+        default=None,
+        help=(
+            "search one of f(x, y) and f(y, x) and derive the other, composing "
+            "each unordered pair once (the default with --minimal)"
+        ),
+    )
+    parser.add_argument(
+        "--no-symmetry",
+        dest="symmetric",
+        action="store_false",
+        default=None,
+        help="search f(x, y) and f(y, x) separately and compose every ordered pair",
+    )
+    parser.add_argument(
+        "--max-cost",
+        type=int,
+        default=40,
+        help="largest TAND count to search with --minimal (default: 40)",
+    )
+    parser.add_argument(
+        "--catalog",
+        nargs="?",
+        const=CATALOG_FILE,
+        metavar="PATH",
+        help=(
+            "search the closure of all reachable functions and save every "
+            f"formula to PATH (default: {CATALOG_FILE}); with --lookup, the "
+            "catalog to read"
+        ),
+    )
+    parser.add_argument(
+        "--checkpoint",
+        nargs="?",
+        const=CHECKPOINT_FILE,
+        metavar="PATH",
+        help=(
+            "save the search state to PATH after each level "
+            f"(default: {CHECKPOINT_FILE})"
+        ),
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help=(
+            "continue from the last completed level in the checkpoint "
+            "(implies --checkpoint)"
+        ),
+    )
+    parser.add_argument(
+        "--store",
+        default=GATE_STORE_FILE,
+        help=f"gate store written by generate_gates.py (default: {GATE_STORE_FILE})",
+    )
+    parser.add_argument(
+        "--targeted",
+        type=int,
+        nargs="?",
+        const=2,
+        default=0,
+        metavar="LEVELS",
+        help=(
+            "look for gates still missing after the search with a meet-in-the-"
+            "middle search up to LEVELS (default: 2) past the known expressions"
+        ),
+    )
+    parser.add_argument(
+        "--basis",
+        nargs="+",
+        metavar="GATE",
+        help=(
+            "build expressions from these gates instead of TAND: each is TAND, a "
+            "gate id or a 9-digit flat table; results are printed but not saved "
+            "to the gate store"
+        ),
+    )
+    parser.add_argument(
+        "--cost-matrix",
+        nargs="?",
+        const=cost_matrix.COST_MATRIX_FILE,
+        metavar="PATH",
+        help=(
+            "compute the fewest applications of each gate that build each other "
+            f"gate and save the matrix to PATH (default: {cost_matrix.COST_MATRIX_FILE})"
+        ),
+    )
+    parser.add_argument(
+        "--circuit",
+        nargs="+",
+        metavar="GATE",
+        help=(
+            "find the fewest TAND gates of a circuit that computes these "
+            "functions, reusing shared gates; each is a gate id, a 9-digit flat "
+            "table or TAND (the --catalog formulas bound larger circuits)"
+        ),
+    )
+    parser.add_argument(
+        "--max-gates",
+        type=int,
+        default=8,
+        help="largest circuit to search with --circuit (default: 8)",
+    )
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="check every stored formula against its gate table and TAND count",
+    )
+    parser.add_argument(
+        "--lookup",
+        nargs=9,
+        type=int,
+        choices=range(3),
+        metavar="V",
+        help="print the catalogued formula of the function with this flat table",
+    )
+    parser.add_argument(
+        "--executor",
+        choices=("auto",) + EXECUTORS,
+        default="auto",
+        help=(
+            "run the search workers as processes, threads or serially "
+            "(default: threads if the GIL is disabled, else processes)"
+        ),
+    )
+    add_arguments(parser)
+    args = parser.parse_args()
+    if args.pareto:
+        ignored = [
+            option
+            for option, given in (
+                ("--minimal", args.minimal),
+                ("--catalog", args.catalog),
+                ("--checkpoint", args.checkpoint),
+                ("--resume", args.resume),
+                ("--targeted", args.targeted),
+                ("--symmetry/--no-symmetry", args.symmetric is not None),
+            )
+            if given
+        ]
+        if ignored:
+            parser.error(f"--pareto cannot be combined with {', '.join(ignored)}")
+    if args.resume and not args.checkpoint:
+        args.checkpoint = CHECKPOINT_FILE
+    return args
+
+
+def _print_lookup(flat_table: List[int], path: str):
+    """Prints the catalogued formula of one function."""
+    if not os.path.exists(path):
+        print(f"Error: catalog '{path}' not found.")
+        print("Please run find_tand_representations.py --catalog first.")
+        return
+    result = lookup(flat_table, path)
+    if result is None:
+        print(f"Function {flat_table} is not reachable from TAND.")
+        return
+    print(f"Function id: {result['func_id']}")
+    print(f"Flat table: {result['flat']}")
+    print(f"TAND operations: {result['tand_operations']}")
+    print(f"Expression: {result['tand_string']}")
+
+
+def _print_circuit(
+    targets: List[Tuple[str, List[List[int]]]], max_gates: int, catalog_path: str
+):
+    """Prints the smallest circuit of each target, and of all of them together."""
+    flat_tables = [sum(table, []) for _, table in targets]
+    groups = [[index] for index in range(len(targets))]
+    if len(targets) > 1:
+        groups.append(list(range(len(targets))))
+    for group in groups:
+        label = ", ".join(targets[index][0] for index in group)
+        result = circuit_search.synthesize_circuit(
+            [flat_tables[index] for index in group], max_gates, catalog_path
+        )
+        if result is None:
+            print(f"\n{label}: no TAND circuit of at most {max_gates} gates.")
+            continue
+        bound = "" if result["exact"] else "at most "
+        print(
+            f"\n{label}: {bound}{result['gates']} gates "
+            f"(formula trees: {result['tree_operations']} TAND operations)"
+        )
+        for name, left, right in result["program"]:
+            print(f"  {name} = TAND({left}, {right})")
+        for index, output in zip(group, result["outputs"]):
+            print(f"  {targets[index][0]} = {output}")
+
+
+def _print_verification(store_path: str) -> bool:
+    """Prints the problems found by verify_gate_store; True if there are none."""
+    if not os.path.exists(store_path):
+        print(f"Error: gate store '{store_path}' not found.")
+        return False
+    start = time.perf_counter()
+    problems = verify_gate_store(store_path)
+    elapsed = time.perf_counter() - start
+    for kind, found in problems.items():
+        print(f"{kind.capitalize()}: {len(found)}")
+        for gate_id, description in found[:10]:
+            print(f"  Gate {gate_id:04d}: {description}")
+        if len(found) > 10:
+            print(f"  ... and {len(found) - 10} more")
+    print(f"Verified {store_path} in {elapsed * 1000:.0f} ms.")
+    return not any(problems.values())
+
+
 def main():
     """Main function to run the entire discovery and update process."""
+    args = _parse_args()
+    if args.lookup:
+        _print_lookup(args.lookup, args.catalog or CATALOG_FILE)
+        return
+    if args.verify:
+        if not _print_verification(args.store):
+            sys.exit(1)
+        return
+
     print("=" * 60)
     print("TAND REPRESENTATION FINDER")
     print("=" * 60)
     print("\nThis script finds how to construct each universal ternary gate")
     print("using only the TAND gate through composition.\n")
 
-    if not os.path.exists("gates"):
-        print("Error: 'gates' directory not found.")
+    if not os.path.exists(args.store):
+        print(f"Error: gate store '{args.store}' not found.")
         print("Please run generate_gates.py first.")
         return
 
-    found_gates = find_tand_representations(max_depth=8)
+    if args.cost_matrix:
+        matrix = cost_matrix.compute_cost_matrix(
+            args.store, args.cost_matrix, executor=args.executor
+        )
+        totals = matrix.sum(axis=1, dtype=np.int64)
+        print("\nCheapest basis gates (total cost to build every gate):")
+        for gate_id in np.argsort(totals, kind="stable")[:10]:
+            print(f"  Gate {gate_id:04d}: {totals[gate_id]:,}")
+        return
+
+    if args.circuit:
+        _print_circuit(
+            parse_basis(args.circuit, args.store),
+            args.max_gates,
+            args.catalog or CATALOG_FILE,
+        )
+        return
 
-    if found_gates:
-        update_gate_files(found_gates)
-        print_statistics(found_gates)
+    basis = parse_basis(args.basis, args.store) if args.basis else TAND_BASIS
+    with Metrics.from_args(args) as metrics:
+        if args.pareto:
+            found_gates = find_pareto_fronts(
+                args.max_depth, args.store, basis, args.executor, metrics
+            )
+        else:
+            found_gates = find_tand_representations(
+                max_depth=args.max_depth,
+                minimal=args.minimal,
+                max_cost=args.max_cost,
+                catalog_path=args.catalog,
+                checkpoint_path=args.checkpoint,
+                resume=args.resume,
+                store_path=args.store,
+                basis=basis,
+                targeted_levels=args.targeted,
+                metrics=metrics,
+                executor=args.executor,
+                symmetric=args.symmetric,
+            )
+
+        if found_gates and args.basis:
+            print_statistics(found_gates)
+        elif found_gates:
+            update_gate_store(found_gates, args.store, metrics)
+            with metrics.phase("export_web_data", directory=WEB_DATA_DIR) as record:
+                web_files = export_web_data(GateStore.open(args.store))
+                record["files"] = web_files
+            print(f"  > Wrote {web_files} web data files to '{WEB_DATA_DIR}/'")
+            print_statistics(found_gates)
 
     print("\n" + "=" * 60)
     print("DONE!")
@@ -0,0 +1,514 @@
+import argparse
+import gzip
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+
+GATE_STORE_FILE = "gates.bin"
+GATE_DIR = "gates"
+WEB_DATA_DIR = "gate_data"
+# Gates per grid page of the web interface, and per compressed detail bundle.
+PAGE_SIZE = 60
+BUNDLE_SIZE = 256
+
+# File layout: a 32-byte header, `count` fixed-width records, then the UTF-8
+# formula blob. Every record points into the blob with an offset and length.
+MAGIC = b"TERNGATE"
+VERSION = 2
+HEADER_DTYPE = np.dtype(
+    [
+        ("magic", "S8"),
+        ("version", "<u2"),
+        ("n", "<u2"),
+        ("flags", "<u4"),
+        ("count", "<u8"),
+        ("blob_offset", "<u8"),
+    ]
+)
+# Set once a search has written its results, so that exported gates without a
+# formula are reported as not found rather than not searched.
+FLAG_SEARCHED = 1
+# `operations` of a gate that has no formula.
+NO_FORMULA = -1
+# Most (depth, TAND count) Pareto points stored per gate, since version 2.
+FRONT_SIZE = 4
+
+
+def record_dtype(n: int, version: int = VERSION) -> np.dtype:
+    """Returns the fixed-width record of one gate of an n-valued logic."""
+    fields = [
+        ("flat", "u1", (n * n,)),
+        ("func_id", "<i8"),
+        ("class_id", "<i4"),
+        ("operations", "<i4"),
+        ("formula_offset", "<i8"),
+        ("formula_length", "<i4"),
+    ]
+    if version >= 2:
+        # The Pareto front of the gate's formulas by increasing depth, with
+        # unused slots at NO_FORMULA operations.
+        fields += [
+            ("front_depth", "<i4", (FRONT_SIZE,)),
+            ("front_operations", "<i4", (FRONT_SIZE,)),
+            ("front_offset", "<i8", (FRONT_SIZE,)),
+            ("front_length", "<i4", (FRONT_SIZE,)),
+        ]
+    return np.dtype(fields)
+
+
+class GateStore:
+    """
+    Columnar store of all gates, their symmetry classes and their formulas.
+
+    The records are a structured NumPy array, one row per gate id, with the
+    flat truth table, its base-n function id, its class id, the TAND count of
+    its formula and the position of the formula in a shared UTF-8 blob, plus
+    up to FRONT_SIZE formulas that trade depth for TAND count. A store opened
+    from disk memory-maps both, so loading it costs a handful of syscalls no
+    matter how many gates it holds.
+    """
+
+    def __init__(
+        self, n: int, records: np.ndarray, blob: bytes = b"", searched: bool = False
+    ):
+        self.n = n
+        self.records = records
+        self.blob = blob
+        self.searched = searched
+
+    @classmethod
+    def from_tables(
+        cls, n: int, flats: np.ndarray, class_ids: Optional[Sequence[int]] = None
+    ) -> "GateStore":
+        """
+        Creates a store of gates without formulas.
+
+        Args:
+            n: The number of logic values.
+            flats: An (m, n*n) array of flat truth tables, in gate id order.
+            class_ids: The symmetry class of each gate (0 for all if omitted).
+        """
+        flats = np.asarray(flats, dtype=np.uint8).reshape(-1, n * n)
+        records = np.zeros(len(flats), dtype=record_dtype(n))
+        records["flat"] = flats
+        powers = n ** np.arange(n * n - 1, -1, -1, dtype=np.int64)
+        records["func_id"] = flats @ powers
+        records["class_id"] = 0 if class_ids is None else class_ids
+        records["operations"] = NO_FORMULA
+        records["front_operations"] = NO_FORMULA
+        return cls(n, records)
+
+    @classmethod
+    def open(cls, path: str = GATE_STORE_FILE) -> "GateStore":
+        """Memory-maps a store written by save."""
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+        if len(header) != 1 or header["magic"][0] != MAGIC:
+            raise ValueError(f"{path} is not a gate store")
+        header = header[0]
+        version = int(header["version"])
+        if not 1 <= version <= VERSION:
+            raise ValueError(
+                f"{path} has gate store version {version}, expected {VERSION}"
+            )
+        n = int(header["n"])
+        count = int(header["count"])
+        blob_offset = int(header["blob_offset"])
+        records = np.memmap(
+            path,
+            dtype=record_dtype(n, version),
+            mode="r",
+            offset=HEADER_DTYPE.itemsize,
+            shape=(count,),
+        )
+        if version < VERSION:
+            # Older stores have no front: copy them into the current layout.
+            upgraded = np.zeros(count, dtype=record_dtype(n))
+            for name in records.dtype.names:
+                upgraded[name] = records[name]
+            upgraded["front_operations"] = NO_FORMULA
+            records = upgraded
+        if os.path.getsize(path) > blob_offset:
+            blob = np.memmap(path, dtype=np.uint8, mode="r", offset=blob_offset)
+        else:
+            blob = b""
+        return cls(n, records, blob, bool(header["flags"] & FLAG_SEARCHED))
+
+    def save(self, path: str = GATE_STORE_FILE):
+        """Writes the store atomically: readers see the old or the new file."""
+        records = np.ascontiguousarray(self.records, dtype=record_dtype(self.n))
+        header = _header(self.n, len(records), self.searched)
+
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(header.tobytes())
+            f.write(records.tobytes())
+            f.write(bytes(self.blob))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def table(self, gate_id: int) -> List[List[int]]:
+        """Returns the n x n truth table of a gate."""
+        return self.records["flat"][gate_id].reshape(self.n, self.n).tolist()
+
+    def flat(self, gate_id: int) -> List[int]:
+        """Returns the flat truth table of a gate."""
+        return self.records["flat"][gate_id].tolist()
+
+    def formula(self, gate_id: int) -> Optional[str]:
+        """Returns the TAND formula string of a gate, or None if it has none."""
+        record = self.records[gate_id]
+        if record["operations"] == NO_FORMULA:
+            return None
+        start = int(record["formula_offset"])
+        end = start + int(record["formula_length"])
+        return bytes(self.blob[start:end]).decode("utf-8")
+
+    def front(self, gate_id: int) -> List[Tuple[int, int, str]]:
+        """
+        Returns the Pareto front of a gate's formulas.
+
+        Returns:
+            (depth, TAND count, formula) triples by increasing depth and
+            decreasing TAND count, empty if no front was stored.
+        """
+        record = self.records[gate_id]
+        front = []
+        for depth, ops, start, length in zip(
+            record["front_depth"].tolist(),
+            record["front_operations"].tolist(),
+            record["front_offset"].tolist(),
+            record["front_length"].tolist(),
+        ):
+            if ops == NO_FORMULA:
+                break
+            formula = bytes(self.blob[start : start + length]).decode("utf-8")
+            front.append((depth, ops, formula))
+        return front
+
+    def with_formulas(
+        self,
+        operations: Sequence[int],
+        formulas: Iterable[Optional[str]],
+        fronts: Optional[Sequence[Sequence[Tuple[int, int, str]]]] = None,
+    ) -> "GateStore":
+        """
+        Returns a copy of the store with new search results.
+
+        Args:
+            operations: The TAND count of each gate's formula, in gate id
+                order (ignored where the formula is None).
+            formulas: The formula string of each gate, or None if not found.
+            fronts: The (depth, TAND count, formula) Pareto points of each
+                gate, at most FRONT_SIZE of them; none are stored if omitted.
+        """
+        records = np.array(self.records)
+        records["operations"] = NO_FORMULA
+        records["formula_offset"] = 0
+        records["formula_length"] = 0
+        records["front_depth"] = 0
+        records["front_operations"] = NO_FORMULA
+        records["front_offset"] = 0
+        records["front_length"] = 0
+        chunks = []
+        offset = 0
+
+        def append(formula: str) -> Tuple[int, int]:
+            nonlocal offset
+            encoded = formula.encode("utf-8")
+            chunks.append(encoded)
+            offset += len(encoded)
+            return offset - len(encoded), len(encoded)
+
+        for gate_id, (ops, formula) in enumerate(zip(operations, formulas)):
+            if formula is None:
+                continue
+            records["operations"][gate_id] = ops
+            (
+                records["formula_offset"][gate_id],
+                records["formula_length"][gate_id],
+            ) = append(formula)
+        for gate_id, front in enumerate(fronts or []):
+            if len(front) > FRONT_SIZE:
+                raise ValueError(
+                    f"Gate {gate_id} has {len(front)} Pareto points, "
+                    f"at most {FRONT_SIZE} fit in a record."
+                )
+            for slot, (depth, ops, formula) in enumerate(front):
+                record = records[gate_id]
+                record["front_depth"][slot] = depth
+                record["front_operations"][slot] = ops
+                (
+                    record["front_offset"][slot],
+                    record["front_length"][slot],
+                ) = append(formula)
+        return GateStore(self.n, records, b"".join(chunks), searched=True)
+
+
+def _header(n: int, count: int, searched: bool = False) -> np.ndarray:
+    """Returns the header of a store of `count` gates of an n-valued logic."""
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header["magic"] = MAGIC
+    header["version"] = VERSION
+    header["n"] = n
+    header["flags"] = FLAG_SEARCHED if searched else 0
+    header["count"] = count
+    header["blob_offset"] = HEADER_DTYPE.itemsize + count * record_dtype(n).itemsize
+    return header
+
+
+class GateStoreWriter:
+    """
+    Writes a store of gates without formulas one chunk of gates at a time.
+
+    Only the current chunk is held in memory, so a store of any size can be
+    written while its gates are still being enumerated. Like GateStore.save,
+    the file only replaces `path` once it is complete.
+    """
+
+    def __init__(self, path: str, n: int):
+        self.path = path
+        self.n = n
+        self.count = 0
+        self._tmp_path = path + ".tmp"
+        self._file = open(self._tmp_path, "wb")
+        self._file.write(_header(n, 0).tobytes())
+
+    def write(self, flats: np.ndarray, class_ids: Optional[Sequence[int]] = None):
+        """Appends gates, as in GateStore.from_tables."""
+        records = GateStore.from_tables(self.n, flats, class_ids).records
+        self._file.write(records.tobytes())
+        self.count += len(records)
+
+    def close(self):
+        """Writes the final header and moves the store into place."""
+        self._file.seek(0)
+        self._file.write(_header(self.n, self.count).tobytes())
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+            os.remove(self._tmp_path)
+
+
+def parse_formula(text: str) -> Union[str, Dict]:
+    """
+    Parses a formula string like "TAND(x, TAND(y, 0))" into its tree.
+
+    Returns:
+        The nested {"op": "TAND", "left": ..., "right": ...} tree, or the leaf
+        name for a formula without any TAND.
+    """
+    tokens = text.replace("(", " ( ").replace(")", " ) ").replace(",", " ").split()
+    # Each open TAND collects its operands; a leaf or a closed TAND is an
+    # operand of the TAND below it on the stack.
+    stack: List[List] = []
+    result = None
+    for token in tokens:
+        if token == "TAND":
+            stack.append([])
+        elif token == "(":
+            continue
+        else:
+            if token == ")":
+                left, right = stack.pop()
+                operand = {"op": "TAND", "left": left, "right": right}
+            else:
+                operand = token
+            if stack:
+                stack[-1].append(operand)
+            else:
+                result = operand
+    if result is None or stack:
+        raise ValueError(f"Malformed formula: {text!r}")
+    return result
+
+
+def gate_details(store: GateStore, gate_id: int) -> Dict:
+    """
+    Returns the JSON fields of one gate.
+
+    These are the fields that generate_gates.py and
+    find_tand_representations.py used to write to each gate_NNNN.json file.
+    """
+    gate_data = {
+        "n": store.n,
+        "gate_id": gate_id,
+        "name": "",
+        "table": store.table(gate_id),
+        "flat": store.flat(gate_id),
+        "class_id": int(store.records["class_id"][gate_id]),
+    }
+    if store.searched:
+        formula = store.formula(gate_id)
+        if formula is None:
+            gate_data["tand_representation"] = None
+            gate_data["tand_string"] = "Not found within search depth"
+            gate_data["tand_operations"] = None
+        else:
+            gate_data["tand_representation"] = parse_formula(formula)
+            gate_data["tand_string"] = formula
+            gate_data["tand_operations"] = int(store.records["operations"][gate_id])
+        front = store.front(gate_id)
+        if front:
+            gate_data["tand_front"] = [
+                {"depth": depth, "tand_operations": ops, "tand_string": formula}
+                for depth, ops, formula in front
+            ]
+    return gate_data
+
+
+def export_gate_files(store: GateStore, output_dir: str = GATE_DIR) -> int:
+    """
+    Writes one gate_NNNN.json file per gate, for consumers of the old layout.
+
+    Returns:
+        The number of files written.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    for gate_id in range(len(store)):
+        filename = os.path.join(output_dir, f"gate_{gate_id:04d}.json")
+        with open(filename, "w") as f:
+            json.dump(gate_details(store, gate_id), f, indent=2)
+    return len(store)
+
+
+def _write_json(path: str, data, compress: bool = False):
+    """Writes minified JSON atomically, gzip-compressed if requested."""
+    payload = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    if compress:
+        payload = gzip.compress(payload, mtime=0)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+def export_web_data(
+    store: GateStore,
+    output_dir: str = WEB_DATA_DIR,
+    page_size: int = PAGE_SIZE,
+    bundle_size: int = BUNDLE_SIZE,
+) -> int:
+    """
+    Writes the data files read by the web interface.
+
+    The web pages need a summary of every gate for the grid and the full
+    details of one gate per detail page. Instead of one file per gate this
+    writes:
+
+    - index.json: minified columns of gate id, flat table (as a string of
+      digits), TAND count (null if none) and class id of every gate.
+    - pages/page_NNNN.json: the grid cards of one page of `page_size` gates,
+      numbered from 1 like the grid pages.
+    - bundles/bundle_NNNN.json.gz: the gzip-compressed details of the
+      `bundle_size` gates starting at NNNN * bundle_size.
+
+    Returns:
+        The number of files written.
+    """
+    os.makedirs(os.path.join(output_dir, "pages"), exist_ok=True)
+    os.makedirs(os.path.join(output_dir, "bundles"), exist_ok=True)
+    count = len(store)
+    operations = store.records["operations"].tolist()
+    ops = [None if op == NO_FORMULA else op for op in operations]
+    class_ids = store.records["class_id"].tolist()
+    flats = ["".join(map(str, flat)) for flat in store.records["flat"].tolist()]
+
+    _write_json(
+        os.path.join(output_dir, "index.json"),
+        {
+            "n": store.n,
+            "count": count,
+            "classes": max(class_ids) + 1 if class_ids else 0,
+            "page_size": page_size,
+            "bundle_size": bundle_size,
+            "id": list(range(count)),
+            "flat": flats,
+            "ops": ops,
+            "class": class_ids,
+        },
+    )
+    written = 1
+
+    for page, start in enumerate(range(0, count, page_size), start=1):
+        cards = [
+            {
+                "gate_id": gate_id,
+                "table": store.table(gate_id),
+                "tand_operations": ops[gate_id],
+                "class_id": class_ids[gate_id],
+            }
+            for gate_id in range(start, min(count, start + page_size))
+        ]
+        _write_json(os.path.join(output_dir, "pages", f"page_{page:04d}.json"), cards)
+        written += 1
+
+    for bundle, start in enumerate(range(0, count, bundle_size)):
+        details = [
+            gate_details(store, gate_id)
+            for gate_id in range(start, min(count, start + bundle_size))
+        ]
+        _write_json(
+            os.path.join(output_dir, "bundles", f"bundle_{bundle:04d}.json.gz"),
+            details,
+            compress=True,
+        )
+        written += 1
+    return written
+
+
+def main():
+    """Exports the gate store to per-gate JSON files or to web data files."""
+    parser = argparse.ArgumentParser(
+        description="Export the gate store to one JSON file per gate."
+    )
+    parser.add_argument(
+        "--store",
+        default=GATE_STORE_FILE,
+        help=f"gate store to read (default: {GATE_STORE_FILE})",
+    )
+    parser.add_argument(
+        "--web",
+        action="store_true",
+        help="write the index, grid pages and detail bundles of the web interface "
+        "instead of one file per gate",
+    )
+    parser.add_argument(
+        "--output-dir",
+        help=f"output directory (default: {GATE_DIR}, or {WEB_DATA_DIR} with --web)",
+    )
+    args = parser.parse_args()
+
+    if not os.path.exists(args.store):
+        print(f"Error: gate store '{args.store}' not found.")
+        print("Please run generate_gates.py first.")
+        return
+    store = GateStore.open(args.store)
+    if args.web:
+        output_dir = args.output_dir or WEB_DATA_DIR
+        count = export_web_data(store, output_dir)
+        print(f"Exported {count} web data files to '{output_dir}/'")
+    else:
+        output_dir = args.output_dir or GATE_DIR
+        count = export_gate_files(store, output_dir)
+        print(f"Exported {count} gate files to '{output_dir}/'")
+
+
+if __name__ == "__main__":
+    main()
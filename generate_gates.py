@@ -7,11 +7,40 @@ For ternary (3-valued) logic, it finds and saves all 3,774 universal gates.
 Adapted from: https://codegolf.stackexchange.com/a/267019
 """
 
+import argparse
+import functools
 import itertools
 import json
+import multiprocessing
 import os
+import time
 from collections import Counter
 
+import numpy as np
+
+from executors import EXECUTORS, create_pool
+from gate_store import (
+    GATE_STORE_FILE,
+    WEB_DATA_DIR,
+    GateStore,
+    GateStoreWriter,
+    export_web_data,
+)
+from metrics import Metrics, add_arguments
+
+
+# Number of operators tested per NumPy block.
+BLOCK_SIZE = 1 << 16
+SHARD_DIR = 'shards'
+OPERATORS_FILE = 'universal_ternary_gates.json'
+# Minimum number of seconds between two progress reports of an enumeration.
+PROGRESS_INTERVAL = 10.0
+# The largest n count_universal finishes for in seconds; for n=5 the
+# constraint algebra does not finish within 15 minutes.
+MAX_COUNT_N = 4
+# Maximum number of entries kept by each constraint algebra cache.
+CACHE_SIZE = 1 << 18
+
 
 def length(x):
     """Count the number of functions in the set."""
@@ -39,15 +68,21 @@ def intersect(a, b):
             if min(d1[0]) in seen:
                 continue
             seen.update(d1[0])
+            if len(d) == 0:
+                return {tuple(q): []}
+            # Hash join of d and d1 on the positions they share
+            shared = [j for j in d1[0] if j in d[0]]
+            index = {}
+            for b_dict in d1:
+                index.setdefault(
+                    tuple(b_dict[j] for j in shared), []
+                ).append(b_dict)
             d2 = []
             for a_dict in d:
-                for b_dict in d1:
+                for b_dict in index.get(tuple(a_dict[j] for j in shared), ()):
                     h = a_dict.copy()
-                    for j, k in b_dict.items():
-                        if h.setdefault(j, k) != k:
-                            break
-                    else:
-                        d2.append(h)
+                    h.update(b_dict)
+                    d2.append(h)
             d = d2
             if len(d) == 0:
                 return {tuple(q): []}
@@ -222,6 +257,104 @@ def union_length(constraint_list):
     return length(x) + union_length(l1) - union_length(l2)
 
 
+def complete_constraint_set(constraint_set, n):
+    """
+    Add every unconstrained position of an n-valued operator to a set.
+
+    length, intersect and union_length expect each position to appear in
+    exactly one key; free positions allow all n values.
+    """
+    result = dict(constraint_set)
+    covered = {i for key in constraint_set for i in key}
+    for x in range(n):
+        for y in range(n):
+            if (x, y) not in covered:
+                result[((x, y),)] = [(v,) for v in range(n)]
+    return result
+
+
+def canonical(constraint_set):
+    """
+    Return a hashable canonical form of a constraint set.
+
+    Positions inside each key are sorted (permuting the value tuples to
+    match), values are sorted, and so are the keys.
+    """
+    items = []
+    for key, values in constraint_set.items():
+        order = sorted(range(len(key)), key=key.__getitem__)
+        items.append((
+            tuple(key[i] for i in order),
+            tuple(sorted(tuple(v[i] for i in order) for v in values)),
+        ))
+    return tuple(sorted(items))
+
+
+def from_canonical(form):
+    """Turn a canonical form back into a constraint set dict."""
+    return {key: list(values) for key, values in form}
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def cached_length(form):
+    """length of a canonical constraint set, memoized."""
+    z = 1
+    for _, values in form:
+        z *= len(values)
+    return z
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def cached_intersect(a, b):
+    """intersect of two canonical constraint sets, memoized."""
+    return canonical(intersect(from_canonical(a), from_canonical(b)))
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def cached_union_length(forms):
+    """
+    union_length of a frozenset of canonical constraint sets, memoized.
+
+    Using a set makes the result independent of the order of the sets and
+    drops duplicates, so more sub-problems hit the cache.
+    """
+    forms = [form for form in forms if cached_length(form) > 0]
+    if len(forms) == 0:
+        return 0
+    x = max(forms, key=lambda form: (cached_length(form), form))
+    l2 = []
+    l1 = []
+    for i in forms:
+        if i != x:
+            ix = cached_intersect(i, x)
+            if cached_length(ix) < cached_length(i):
+                l1.append(i)
+                l2.append(ix)
+    return (
+        cached_length(x)
+        + cached_union_length(frozenset(l1))
+        - cached_union_length(frozenset(l2))
+    )
+
+
+def count_universal(n):
+    """
+    Count the universal operators of n-valued logic without enumerating them.
+
+    This is n^(n*n) minus the size of the union of all constraint sets,
+    computed with the memoized constraint algebra. It takes seconds up to
+    n = MAX_COUNT_N; beyond that the number of constraint set intersections
+    explodes.
+    """
+    if n == 1:
+        return 1
+    forms = frozenset(
+        canonical(complete_constraint_set(z_set, n))
+        for z_set in build_constraint_sets(n)
+    )
+    return n ** (n * n) - cached_union_length(forms)
+
+
 def satisfies_constraint_set(func_table, constraint_set, n):
     """Check if a function table satisfies a constraint set."""
     for key, values in constraint_set.items():
@@ -234,19 +367,12 @@ def satisfies_constraint_set(func_table, constraint_set, n):
     return True
 
 
-def magic_enumerate(n):
+def build_constraint_sets(n):
     """
-    Enumerate all universal operators for n-valued logic.
-    
-    Args:
-        n: The number of logic values (e.g., 3 for ternary logic)
-    
-    Returns:
-        List of universal operators as 2D tables
+    Build the constraint sets of n-valued logic.
+
+    An operator is universal exactly when it satisfies none of them.
     """
-    if n == 1:
-        return [[[0]]]
-    
     values = list(range(n))
     constraint_sets = []
     
@@ -292,101 +418,698 @@ def magic_enumerate(n):
     for p in factors(n):
         constraint_sets.extend(special_permutations(n, p))
     
-    # Enumerate all possible operators
+    return constraint_sets
+
+
+def compile_constraint_set(constraint_set, n):
+    """
+    Compile a constraint set into lookup arrays over output positions.
+
+    Each key becomes (positions, powers, allowed): the flat table positions
+    it reads, the base-n weights that turn their outputs into a code, and a
+    boolean array telling whether each code is an allowed output tuple.
+    """
+    compiled = []
+    for key, values in constraint_set.items():
+        positions = np.array([i * n + j for i, j in key])
+        powers = n ** np.arange(len(key) - 1, -1, -1, dtype=np.int64)
+        allowed = np.zeros(n ** len(key), dtype=bool)
+        if values:
+            allowed[np.array(values, dtype=np.int64) @ powers] = True
+        compiled.append((positions, powers, allowed))
+    return compiled
+
+
+def operators_from_ids(n, ids):
+    """
+    Return the operators with the given ids as an (m, n*n) array.
+
+    Operator ids follow itertools.product order, so the first output of the
+    flat table is the most significant base-n digit.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    powers = n ** np.arange(n * n - 1, -1, -1, dtype=np.int64)
+    return ((ids[:, None] // powers) % n).astype(np.uint8)
+
+
+def operator_ids(operators, n):
+    """Return the ids of an (m, n*n) array of operators."""
+    powers = n ** np.arange(n * n - 1, -1, -1, dtype=np.int64)
+    return operators @ powers
+
+
+def operator_block(n, start, stop):
+    """Return the operators with ids in [start, stop) as an (m, n*n) array."""
+    return operators_from_ids(n, np.arange(start, stop, dtype=np.int64))
+
+
+def universal_mask(operators, compiled_sets):
+    """Return a mask of the operators that satisfy no constraint set."""
+    universal = np.ones(len(operators), dtype=bool)
+    for compiled in compiled_sets:
+        satisfied = universal.copy()
+        for positions, powers, allowed in compiled:
+            satisfied[satisfied] = allowed[
+                operators[satisfied][:, positions] @ powers
+            ]
+            if not satisfied.any():
+                break
+        universal &= ~satisfied
+    return universal
+
+
+def symmetry_group(n):
+    """
+    Return the symmetries of n-valued operators that preserve universality.
+
+    These are the conjugations g(x, y) = p(f(q(x), q(y))) by a permutation p
+    of the values (q being its inverse), each with and without swapping x
+    and y. Each symmetry is a (positions, values) pair: the flat table of
+    the image of f is values[f[positions]].
+    """
+    group = []
+    for perm in itertools.permutations(range(n)):
+        inverse = [perm.index(v) for v in range(n)]
+        for swap in (False, True):
+            positions = [
+                inverse[y] * n + inverse[x] if swap
+                else inverse[x] * n + inverse[y]
+                for x in range(n)
+                for y in range(n)
+            ]
+            group.append((np.array(positions), np.array(perm, dtype=np.uint8)))
+    return group
+
+
+def canonical_mask(operators, group, n):
+    """
+    Return a mask of the operators that represent their orbit.
+
+    The representative of an orbit is its operator with the smallest id.
+    """
+    ids = operator_ids(operators, n)
+    canonical = np.ones(len(operators), dtype=bool)
+    for positions, values in group:
+        images = values[operators[canonical][:, positions]]
+        canonical[canonical] = ids[canonical] <= operator_ids(images, n)
+    return canonical
+
+
+def orbit_ids(operators, group, n):
+    """Return an (m, |group|) array of the ids of the images of operators."""
+    return np.stack([
+        operator_ids(values[operators[:, positions]], n)
+        for positions, values in group
+    ], axis=1)
+
+
+def representative_range(n):
+    """
+    Return the [start, stop) ids that can hold a universal representative.
+
+    A universal operator never has f(a, a) = a (it would preserve {a}), so
+    no operator of its orbit starts with f(0, 0) = 0, and conjugating by a
+    permutation with a -> 0 and f(a, a) -> 1 gives one with f(0, 0) = 1.
+    The smallest id of a universal orbit therefore has leading digit 1.
+    """
+    lead = n ** (n * n - 1)
+    return lead, 2 * lead
+
+
+def universal_representatives(n):
+    """
+    Return the universal representatives of the orbits under symmetry_group.
+
+    Only the representatives are checked against the constraint sets (up to
+    2 * n! fewer checks), and only in representative_range.
+
+    Returns:
+        An (m, n*n) uint8 array of their flat tables, in increasing id
+        order, so row i represents class i.
+    """
+    compiled_sets = [
+        compile_constraint_set(z_set, n) for z_set in build_constraint_sets(n)
+    ]
+    group = symmetry_group(n)
+    first, last = representative_range(n)
+    representatives = []
+    
+    for start in range(first, last, BLOCK_SIZE):
+        operators = operator_block(n, start, min(last, start + BLOCK_SIZE))
+        operators = operators[canonical_mask(operators, group, n)]
+        representatives.append(
+            operators[universal_mask(operators, compiled_sets)]
+        )
+    
+    return np.concatenate(representatives)
+
+
+def enumerate_classes(n):
+    """
+    Enumerate the universal operators, testing one operator per orbit.
+
+    Each of the universal_representatives is expanded back into its whole
+    orbit.
+
+    Returns:
+        A tuple (ids, class_ids) of arrays sorted by operator id, where
+        class_ids[i] numbers the orbit of operator ids[i], in the order of
+        the smallest id of each orbit.
+    """
+    group = symmetry_group(n)
+    representatives = universal_representatives(n)
+    ids = []
+    class_ids = []
+    for class_id, orbit in enumerate(orbit_ids(representatives, group, n)):
+        orbit = np.unique(orbit)
+        ids.append(orbit)
+        class_ids.append(np.full(len(orbit), class_id))
+    ids = np.concatenate(ids)
+    class_ids = np.concatenate(class_ids)
+    order = np.argsort(ids)
+    return ids[order], class_ids[order]
+
+
+def iter_universal(n, start=0, stop=None, ids=False, progress=None,
+                   interval=PROGRESS_INTERVAL):
+    """
+    Yield the universal operators of n-valued logic, a block at a time.
+    
+    The operator ids in [start, stop) are tested BLOCK_SIZE at a time, and
+    the universal operators of each block are yielded as soon as it is
+    tested, so memory stays bounded by one block however many are found.
+    
+    Args:
+        n: The number of logic values
+        start: The first operator id to test
+        stop: The operator id to stop before (default: all, n ** (n * n))
+        ids: If True, yield arrays of operator ids instead of flat tables
+        progress: If given, called as progress(checked, total, found) at
+            most once every `interval` seconds, and once at the end
+        interval: The minimum number of seconds between progress calls
+    
+    Yields:
+        Non-empty (m, n*n) uint8 arrays of flat tables (or int64 arrays of
+        ids), in increasing id order
+    """
+    if stop is None:
+        stop = n ** (n * n)
+    if n == 1:
+        if start < stop:
+            yield np.zeros(1, dtype=np.int64) if ids else np.zeros(
+                (1, 1), dtype=np.uint8
+            )
+        if progress is not None:
+            progress(stop - start, stop - start, stop - start)
+        return
+    
+    compiled_sets = [
+        compile_constraint_set(z_set, n) for z_set in build_constraint_sets(n)
+    ]
+    found = 0
+    last_report = time.monotonic()
+    
+    for block_start in range(start, stop, BLOCK_SIZE):
+        block_stop = min(stop, block_start + BLOCK_SIZE)
+        operators = operator_block(n, block_start, block_stop)
+        mask = universal_mask(operators, compiled_sets)
+        found += int(mask.sum())
+        if mask.any():
+            yield np.flatnonzero(mask) + block_start if ids else operators[mask]
+        
+        now = time.monotonic()
+        if progress is not None and (
+            now - last_report >= interval or block_stop == stop
+        ):
+            last_report = now
+            progress(block_stop - start, stop - start, found)
+
+
+def iter_classes(n, progress=None, interval=PROGRESS_INTERVAL):
+    """
+    Yield the universal operators with their symmetry classes, a block at a time.
+    
+    Like enumerate_classes, only the universal_representatives are tested
+    against the constraint sets, and class ids are numbered in the order of
+    the smallest id of each orbit. Their orbits are then expanded one block
+    of ids at a time: an operator is universal when the smallest id of its
+    orbit is a representative, whose index is its class id. Only the
+    representatives are held in memory, not the operators.
+    
+    Args:
+        n: The number of logic values
+        progress: If given, called as progress(checked, total, found) for
+            the expansion, as in iter_universal
+        interval: The minimum number of seconds between progress calls
+    
+    Yields:
+        (flats, class_ids) pairs of a non-empty (m, n*n) uint8 array of flat
+        tables, in increasing id order, and the class id of each
+    """
+    if n == 1:
+        for operators in iter_universal(n, progress=progress,
+                                        interval=interval):
+            yield operators, np.zeros(len(operators), dtype=np.int32)
+        return
+    
+    group = symmetry_group(n)
+    representatives = operator_ids(universal_representatives(n), n)
+    total = n ** (n * n)
+    found = 0
+    last_report = time.monotonic()
+    
+    for start in range(0, total, BLOCK_SIZE):
+        stop = min(total, start + BLOCK_SIZE)
+        operators = operator_block(n, start, stop)
+        smallest = orbit_ids(operators, group, n).min(axis=1)
+        class_ids = np.searchsorted(representatives, smallest)
+        mask = representatives[
+            np.minimum(class_ids, len(representatives) - 1)
+        ] == smallest
+        found += int(mask.sum())
+        if mask.any():
+            yield operators[mask], class_ids[mask].astype(np.int32)
+        
+        now = time.monotonic()
+        if progress is not None and (
+            now - last_report >= interval or stop == total
+        ):
+            last_report = now
+            progress(stop, total, found)
+
+
+def print_progress(metrics=None, event='enumerate_progress'):
+    """
+    Return a progress callback for iter_universal that prints a line.
+    
+    If metrics is given, every call is also recorded there as an event.
+    """
+    def progress(checked, total, found):
+        print(f"Checked {checked}/{total}, "
+              f"found {found} universal ops so far...")
+        if metrics is not None:
+            metrics.emit(event, checked=checked, total=total, found=found)
+    
+    return progress
+
+
+def magic_enumerate(n, metrics=None):
+    """
+    Enumerate all universal operators for n-valued logic.
+    
+    This collects iter_universal into one list; iterate over that instead
+    to handle operators as they are found without holding them all.
+    
+    Args:
+        n: The number of logic values (e.g., 3 for ternary logic)
+        metrics: If given, a metrics.Metrics that receives the progress
+            reports and a record for the whole enumeration
+    
+    Returns:
+        List of universal operators as 2D tables
+    """
+    if n == 1:
+        return [[[0]]]
+    
+    metrics = metrics or Metrics()
     universal_ops = []
-    total = 0
     total_ops = n ** (n * n)
     
     print(f"Total operators to check: {total_ops}")
     
-    for func_values in itertools.product(range(n), repeat=n * n):
-        # Convert to table format
-        func_table = [
-            [func_values[i * n + j] for j in range(n)]
-            for i in range(n)
-        ]
-        
-        # Check if universal (doesn't satisfy any constraint)
-        is_universal = True
-        for z_set in constraint_sets:
-            if satisfies_constraint_set(func_table, z_set, n):
-                is_universal = False
-                break
-        
-        if is_universal:
-            universal_ops.append(func_table)
-        
-        total += 1
-        if total % 1000 == 0:
-            print(
-                f"Checked {total}/{total_ops}, "
-                f"found {len(universal_ops)} universal ops so far..."
-            )
+    with metrics.phase("magic_enumerate", n=n) as record:
+        progress = print_progress(metrics, 'magic_enumerate_progress')
+        for operators in iter_universal(n, progress=progress):
+            # Convert to table format
+            universal_ops.extend(operators.reshape(-1, n, n).tolist())
+        record["operators"] = total_ops
+        record["universal"] = len(universal_ops)
     
     return universal_ops
 
 
-def main():
-    """Generate and save all universal ternary logic gates."""
-    print("Computing universal ternary logic gates...")
-    n = 3
+class OperatorJsonWriter:
+    """
+    Writes the combined JSON file of operators one chunk at a time.
+    
+    The file holds n, the list of operators (table, flat table and class
+    id of each) and then their count and number of classes, which are only
+    known once every chunk is written. As with GateStoreWriter, it is
+    written to a temporary file that only replaces `path` once complete.
+    """
     
-    # Create gates directory
-    os.makedirs('gates', exist_ok=True)
+    def __init__(self, path, n):
+        self.path = path
+        self.n = n
+        self.count = 0
+        self.classes = 0
+        self._tmp_path = path + '.tmp'
+        self._file = open(self._tmp_path, 'w')
+        self._file.write(f'{{\n  "n": {n},\n  "operators": [')
     
-    operators = magic_enumerate(n)
-    print(f"Found {len(operators)} universal operators")
-    print("Saving individual gate files...")
+    def write(self, flats, class_ids):
+        """Append operators given as flat tables with their class ids."""
+        n = self.n
+        for flat, class_id in zip(flats.tolist(), class_ids.tolist()):
+            entry = {
+                "table": [flat[i * n:(i + 1) * n] for i in range(n)],
+                "flat": flat,
+                "class_id": class_id
+            }
+            separator = ',' if self.count else ''
+            text = json.dumps(entry, indent=2).replace('\n', '\n    ')
+            self._file.write(f'{separator}\n    {text}')
+            self.count += 1
+            self.classes = max(self.classes, class_id + 1)
     
-    # Convert to more readable format and save individual files
-    output = {
-        "n": n,
-        "count": len(operators),
-        "operators": []
-    }
+    def close(self):
+        """Write the totals and move the file into place."""
+        self._file.write(
+            f'\n  ],\n  "count": {self.count},\n'
+            f'  "classes": {self.classes}\n}}'
+        )
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
     
-    for gate_id, op in enumerate(operators):
-        # op is already a 2D table
-        # Flatten it for the flat representation
-        flat = [op[i][j] for i in range(n) for j in range(n)]
-        
-        gate_data = {
-            "table": op,
-            "flat": flat
-        }
-        
-        output["operators"].append(gate_data)
-        
-        # Save individual gate file
-        individual_gate = {
-            "n": n,
-            "gate_id": gate_id,
-            "name": "",
-            "table": op,
-            "flat": flat
-        }
-        
-        filename = f'gates/gate_{gate_id:04d}.json'
-        with open(filename, 'w') as f:
-            json.dump(individual_gate, indent=2, fp=f)
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+            os.remove(self._tmp_path)
+
+
+def shard_range(n, index, count, symmetric=False):
+    """
+    Return the [start, stop) operator ids of shard `index` out of `count`.
+
+    Shard boundaries are multiples of BLOCK_SIZE (except the last stop), so
+    every shard bitmap starts on a byte boundary of the merged bitmap. With
+    symmetric=True the shards only cover representative_range.
+    """
+    first, last = representative_range(n) if symmetric else (0, n ** (n * n))
+    blocks = (last - first + BLOCK_SIZE - 1) // BLOCK_SIZE
+    start = min(last, first + blocks * index // count * BLOCK_SIZE)
+    stop = min(last, first + blocks * (index + 1) // count * BLOCK_SIZE)
+    return start, stop
+
+
+def shard_path(n, index, count, output_dir=SHARD_DIR, symmetric=False):
+    """Return the file name of a shard bitmap (or representative list)."""
+    suffix = '_sym' if symmetric else ''
+    name = f'universal_n{n}_{index:05d}_of_{count:05d}{suffix}.npz'
+    return os.path.join(output_dir, name)
+
+
+def orbit_sizes(operators, group, n):
+    """Return the number of distinct operators in the orbit of each one."""
+    images = np.sort(orbit_ids(operators, group, n), axis=1)
+    return 1 + (np.diff(images, axis=1) != 0).sum(axis=1)
+
+
+def enumerate_shard(n, index, count, output_dir=SHARD_DIR, symmetric=False):
+    """
+    Test every operator of one shard and save a bitmap of the universal ones.
+
+    The bitmap holds one bit per operator id in the shard range (packed with
+    np.packbits), so a shard of n=4 takes 1/8 byte per operator instead of a
+    JSON table per universal operator. With symmetric=True only the orbit
+    representatives are tested, and the shard saves the ids of the
+    universal ones instead; merge_shards expands their orbits. Shards
+    already on disk are skipped.
+
+    Returns:
+        The number of universal operators in the shard (counting whole
+        orbits when symmetric).
+    """
+    path = shard_path(n, index, count, output_dir, symmetric)
+    if os.path.exists(path):
+        with np.load(path) as shard:
+            return int(shard['count'])
+    
+    compiled_sets = [
+        compile_constraint_set(z_set, n) for z_set in build_constraint_sets(n)
+    ]
+    group = symmetry_group(n)
+    start, stop = shard_range(n, index, count, symmetric)
+    bits = np.zeros((stop - start + 7) // 8, dtype=np.uint8)
+    representatives = []
+    found = 0
+    last_report = time.monotonic()
+    
+    for block_start in range(start, stop, BLOCK_SIZE):
+        block_stop = min(stop, block_start + BLOCK_SIZE)
+        operators = operator_block(n, block_start, block_stop)
+        if symmetric:
+            operators = operators[canonical_mask(operators, group, n)]
+            operators = operators[universal_mask(operators, compiled_sets)]
+            representatives.append(operator_ids(operators, n))
+            found += int(orbit_sizes(operators, group, n).sum())
+        else:
+            mask = universal_mask(operators, compiled_sets)
+            offset = (block_start - start) // 8
+            packed = np.packbits(mask)
+            bits[offset:offset + len(packed)] = packed
+            found += int(mask.sum())
         
-        if (gate_id + 1) % 500 == 0:
-            print(f"  Saved {gate_id + 1}/{len(operators)} gate files...")
+        now = time.monotonic()
+        if now - last_report >= PROGRESS_INTERVAL:
+            last_report = now
+            done = block_stop - start
+            print(
+                f"[shard {index}/{count}] checked {done}/{stop - start} "
+                f"({100 * done / (stop - start):.1f}%), "
+                f"found {found} universal ops"
+            )
     
+    if symmetric:
+        data = {'representatives': np.concatenate(
+            representatives or [np.empty(0, dtype=np.int64)]
+        )}
+    else:
+        data = {'bits': bits}
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, n=n, start=start, stop=stop, count=found, **data)
+    os.replace(tmp_path, path)
     print(
-        f"All {len(operators)} individual gate files "
-        f"saved to 'gates/' folder"
+        f"[shard {index}/{count}] done: "
+        f"{found} universal ops in [{start}, {stop})"
     )
+    return found
+
+
+def run_shards(n, indices, count, workers=None, output_dir=SHARD_DIR,
+               symmetric=False, executor=None):
+    """
+    Enumerate the given shards on a pool of workers.
+
+    The workers are processes, threads or the caller itself, as chosen by
+    executor (see executors.create_pool; by default threads when the GIL is
+    disabled and processes otherwise).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or multiprocessing.cpu_count()
+    args = [(n, index, count, output_dir, symmetric) for index in indices]
+    with create_pool(executor, min(workers, len(args))) as pool:
+        found = pool.starmap(enumerate_shard, args)
+    print(f"Shards {list(indices)[0]}..{list(indices)[-1]} of {count}: "
+          f"{sum(found)} universal operators")
+    return sum(found)
+
+
+def merge_shards(n, count, output_dir=SHARD_DIR, symmetric=False):
+    """
+    Combine all shard bitmaps of n into one bitmap over every operator id.
+
+    The merged bitmap is written through a memory map, one shard at a time,
+    to `universal_n{n}.bits` next to a small JSON header. Symmetric shards
+    have their representatives expanded into whole orbits, and the sorted
+    representatives are saved too: the class id of an operator is the index
+    of the smallest id of its orbit there.
+
+    Returns:
+        The total number of universal operators.
+    """
+    total_ops = n ** (n * n)
+    bits_path = os.path.join(output_dir, f'universal_n{n}.bits')
+    merged = np.memmap(bits_path, dtype=np.uint8, mode='w+',
+                       shape=((total_ops + 7) // 8,))
+    group = symmetry_group(n)
+    representatives = []
+    total = 0
+    for index in range(count):
+        path = shard_path(n, index, count, output_dir, symmetric)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Missing shard {index}/{count}: {path}")
+        with np.load(path) as shard:
+            if symmetric:
+                shard_reps = shard['representatives']
+                representatives.append(shard_reps)
+                for chunk in range(0, len(shard_reps), BLOCK_SIZE):
+                    ids = orbit_ids(operators_from_ids(
+                        n, shard_reps[chunk:chunk + BLOCK_SIZE]
+                    ), group, n).ravel()
+                    np.bitwise_or.at(
+                        merged, ids // 8,
+                        (0x80 >> (ids % 8)).astype(np.uint8)
+                    )
+            else:
+                start = int(shard['start'])
+                bits = shard['bits']
+                merged[start // 8:start // 8 + len(bits)] = bits
+            total += int(shard['count'])
+    merged.flush()
+    del merged
     
-    # Save combined JSON
-    with open('universal_ternary_gates.json', 'w') as f:
-        json.dump(output, f, indent=2)
+    header = {
+        "n": n,
+        "total_ops": total_ops,
+        "count": total,
+        "bitmap": os.path.basename(bits_path),
+        "bit_order": "big",
+    }
+    if symmetric:
+        classes_path = os.path.join(output_dir, f'universal_n{n}_classes.npy')
+        np.save(classes_path, np.sort(np.concatenate(representatives)))
+        header["classes"] = int(sum(len(r) for r in representatives))
+        header["representatives"] = os.path.basename(classes_path)
+    with open(os.path.join(output_dir, f'universal_n{n}.json'), 'w') as f:
+        json.dump(header, f, indent=2)
+    print(f"Merged {count} shards: {total} universal operators for n={n}")
+    return total
+
+
+def parse_shard(text):
+    """Parse an `i/N` shard argument into (i, N)."""
+    index, count = (int(part) for part in text.split('/'))
+    if not 0 <= index < count:
+        raise argparse.ArgumentTypeError(
+            f"shard index must be in [0, {count})"
+        )
+    return index, count
+
+
+def parse_args():
+    """Parse the command line options."""
+    parser = argparse.ArgumentParser(
+        description="Generate all universal operators of n-valued logic."
+    )
+    parser.add_argument('--n', type=int, default=3,
+                        help="number of logic values (default: 3)")
+    parser.add_argument('--shards', type=int,
+                        help="split the operator ids into this many shards "
+                             "and write one bitmap per shard instead of "
+                             "gate files")
+    parser.add_argument('--shard', type=parse_shard, metavar='i/N',
+                        help="enumerate only shard i of N (0-based), e.g. to "
+                             "spread the shards over several machines")
+    parser.add_argument('--workers', type=int,
+                        help="workers for sharded runs (default: all cores)")
+    parser.add_argument('--executor', choices=('auto',) + EXECUTORS,
+                        default='auto',
+                        help="run the shard workers as processes, threads or "
+                             "serially (default: threads if the GIL is "
+                             "disabled, else processes)")
+    parser.add_argument('--count', action='store_true',
+                        help="only count the universal operators of n "
+                             "analytically, without enumerating them")
+    parser.add_argument('--symmetric', action='store_true',
+                        help="only test one operator per orbit under value "
+                             "relabeling and input swap, and expand orbits "
+                             "when merging")
+    parser.add_argument('--merge', action='store_true',
+                        help="combine the shard bitmaps of --shards N")
+    parser.add_argument('--output-dir', default=SHARD_DIR,
+                        help="directory of the shard bitmaps "
+                             f"(default: {SHARD_DIR})")
+    add_arguments(parser)
+    args = parser.parse_args()
+    if args.merge and not args.shards:
+        parser.error("--merge requires --shards N")
+    if args.count and args.n > MAX_COUNT_N:
+        parser.error(f"--count only finishes for n <= {MAX_COUNT_N}; larger n "
+                     "does not finish in reasonable time")
+    if args.n != 3 and not (args.count or args.shards or args.shard):
+        parser.error("--n other than 3 requires --shards, --shard or --count; "
+                     "the gate store and combined JSON are for n=3 only")
+    return args
+
+
+def main_sharded(args):
+    """Run or merge a sharded enumeration."""
+    if args.shard:
+        index, count = args.shard
+        run_shards(args.n, [index], count, 1, args.output_dir,
+                   args.symmetric, args.executor)
+    elif args.merge:
+        merge_shards(args.n, args.shards, args.output_dir, args.symmetric)
+    else:
+        run_shards(args.n, range(args.shards), args.shards, args.workers,
+                   args.output_dir, args.symmetric, args.executor)
+
+
+def main():
+    """Generate and save all universal ternary logic gates."""
+    args = parse_args()
+    if args.count:
+        start = time.perf_counter()
+        count = count_universal(args.n)
+        print(
+            f"{count} universal operators out of {args.n ** (args.n ** 2)} "
+            f"for n={args.n} (counted in {time.perf_counter() - start:.2f}s)"
+        )
+        return
+    with Metrics.from_args(args) as metrics:
+        if args.shard or args.shards:
+            with metrics.phase("sharded_run", n=args.n, shards=args.shards):
+                main_sharded(args)
+        else:
+            main_store(metrics)
+
+
+def main_store(metrics):
+    """Enumerate the ternary gates and stream them to the store and JSON."""
+    print("Computing universal ternary logic gates...")
+    n = 3
+    example = None
     
-    print("Saved combined file to universal_ternary_gates.json")
+    # One binary file instead of a JSON file per gate; run gate_store.py to
+    # export gates/gate_NNNN.json for consumers that still read those. Both
+    # files are written block by block as the operators are found.
+    with metrics.phase("enumerate_and_save", n=n) as record:
+        with GateStoreWriter(GATE_STORE_FILE, n) as store, \
+                OperatorJsonWriter(OPERATORS_FILE, n) as output:
+            for flats, class_ids in iter_classes(n, print_progress(metrics)):
+                if example is None:
+                    example = flats[0].reshape(n, n).tolist()
+                store.write(flats, class_ids)
+                output.write(flats, class_ids)
+        record["universal"] = output.count
+        record["classes"] = output.classes
+        record["bytes_written"] = (
+            os.path.getsize(GATE_STORE_FILE) + os.path.getsize(OPERATORS_FILE)
+        )
+    print(
+        f"Found {output.count} universal operators "
+        f"in {output.classes} symmetry classes"
+    )
+    print(f"Saved {store.count} gates to {GATE_STORE_FILE}")
+    print(f"Saved combined file to {OPERATORS_FILE}")
+
+    # The web interface reads only gate_data/; write it now so that the site
+    # works before find_tand_representations.py adds the TAND formulas.
+    with metrics.phase("export_web_data", directory=WEB_DATA_DIR) as record:
+        web_files = export_web_data(GateStore.open(GATE_STORE_FILE))
+        record["files"] = web_files
+    print(f"Wrote {web_files} web data files to '{WEB_DATA_DIR}/'")
     print("\nFirst operator as example:")
     print("   0 1 2")
     for i in range(n):
-        print(f"{i}: {output['operators'][0]['table'][i]}")
+        print(f"{i}: {example[i]}")
 
 
 if __name__ == '__main__':
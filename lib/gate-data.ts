@@ -0,0 +1,84 @@
+import fs from 'fs';
+import path from 'path';
+import zlib from 'zlib';
+
+// Written by `python gate_store.py --web` (and by find_tand_representations.py).
+const DATA_DIR = path.join(process.cwd(), 'gate_data');
+
+export interface TandNode {
+  op: string;
+  left?: TandNode | string | number;
+  right?: TandNode | string | number;
+}
+
+export interface GateIndex {
+  n: number;
+  count: number;
+  classes: number;
+  page_size: number;
+  bundle_size: number;
+  id: number[];
+  flat: string[];
+  ops: (number | null)[];
+  class: number[];
+}
+
+export interface GateCard {
+  gate_id: number;
+  table: number[][];
+  tand_operations: number | null;
+  class_id: number;
+}
+
+export interface ParetoPoint {
+  depth: number;
+  tand_operations: number;
+  tand_string: string;
+}
+
+export interface Gate {
+  n: number;
+  gate_id: number;
+  table: number[][];
+  flat: number[];
+  class_id: number;
+  tand_representation?: TandNode | null;
+  tand_string?: string;
+  tand_operations?: number | null;
+  tand_front?: ParetoPoint[];
+}
+
+let index: GateIndex | null = null;
+const bundles = new Map<number, Gate[]>();
+
+export function loadGateIndex(): GateIndex {
+  if (!index) {
+    index = JSON.parse(fs.readFileSync(path.join(DATA_DIR, 'index.json'), 'utf-8')) as GateIndex;
+  }
+  return index;
+}
+
+export function loadGatePage(page: number): GateCard[] {
+  const filePath = path.join(DATA_DIR, 'pages', `page_${page.toString().padStart(4, '0')}.json`);
+  if (!fs.existsSync(filePath)) {
+    return [];
+  }
+  return JSON.parse(fs.readFileSync(filePath, 'utf-8'));
+}
+
+export function loadGate(gateId: number): Gate | null {
+  const { bundle_size: bundleSize } = loadGateIndex();
+  const bundle = Math.floor(gateId / bundleSize);
+
+  // Every detail page of a bundle shares one decompressed copy during a build.
+  let gates = bundles.get(bundle);
+  if (!gates) {
+    const filePath = path.join(DATA_DIR, 'bundles', `bundle_${bundle.toString().padStart(4, '0')}.json.gz`);
+    if (!fs.existsSync(filePath)) {
+      return null;
+    }
+    gates = JSON.parse(zlib.gunzipSync(fs.readFileSync(filePath)).toString('utf-8')) as Gate[];
+    bundles.set(bundle, gates);
+  }
+  return gates[gateId - bundle * bundleSize] ?? null;
+}
@@ -0,0 +1,185 @@
+"""
+Structured metrics for the gate generation and TAND search scripts.
+
+A Metrics object turns every event or phase of a run (a search level, a
+store update, ...) into one JSON record, and writes it as a line to a file
+and/or passes it to a callback. Phases record their wall and CPU time and the
+peak RSS of the process, and can be profiled with cProfile or traced with
+tracemalloc. A Metrics object without a file or callback records nothing, so
+instrumented functions can always take one.
+"""
+
+import argparse
+import cProfile
+import contextlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, Iterator, Union
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_bytes(children: bool = False) -> Union[int, None]:
+    """
+    Returns the peak resident set size of this process in bytes.
+
+    Args:
+        children: If True, the largest peak of the child processes that have
+            been waited for (e.g. the workers of a closed pool) instead.
+
+    Returns:
+        The peak in bytes, or None where the resource module is missing.
+    """
+    if resource is None:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Metrics:
+    """
+    Collects per-phase metrics and emits them as JSON lines.
+
+    Every record has an "event" name and a "time" in seconds since the
+    Metrics object was created, followed by its own fields.
+    """
+
+    def __init__(
+        self,
+        path: str = None,
+        callback: Callable[[Dict], None] = None,
+        profile_dir: str = None,
+        trace_memory: bool = False,
+    ):
+        """
+        Args:
+            path: If given, records are appended to this file, one per line.
+            callback: If given, called with every record as a dict.
+            profile_dir: If given, every phase runs under cProfile and its
+                stats are dumped to <profile_dir>/<phase>_<index>.prof.
+            trace_memory: If True, phases also record the peak of the memory
+                allocated by Python objects, traced with tracemalloc.
+        """
+        self.callback = callback
+        self.profile_dir = profile_dir
+        self.trace_memory = trace_memory
+        self._file = open(path, "a") if path else None
+        self._start = time.perf_counter()
+        self._profiling = False
+        self._phase_counts = {}
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @classmethod
+    def from_args(cls, args: argparse.Namespace) -> "Metrics":
+        """Creates the Metrics requested by the add_arguments options."""
+        return cls(args.metrics, profile_dir=args.profile, trace_memory=args.trace_memory)
+
+    @property
+    def enabled(self) -> bool:
+        """True if records go anywhere."""
+        return self._file is not None or self.callback is not None
+
+    def emit(self, event: str, **fields):
+        """Emits one record."""
+        if not self.enabled:
+            return
+        record = {"event": event, "time": round(time.perf_counter() - self._start, 6)}
+        record.update(fields)
+        if self._file is not None:
+            self._file.write(json.dumps(record, default=_to_json) + "\n")
+            self._file.flush()
+        if self.callback is not None:
+            self.callback(record)
+
+    @contextlib.contextmanager
+    def phase(self, name: str, **fields) -> Iterator[Dict]:
+        """
+        Measures the enclosed block and emits it as one record.
+
+        Yields a dict, pre-filled with `fields`, to which the block adds its
+        own counters. On exit it gains wall_seconds, cpu_seconds and
+        peak_rss_bytes, and traced_peak_bytes or profile when enabled. Nested
+        phases are measured too, but only the outermost one is profiled.
+        """
+        record = dict(fields)
+        profiler = None
+        if self.profile_dir and not self._profiling:
+            profiler = cProfile.Profile()
+            self._profiling = True
+            profiler.enable()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            record["wall_seconds"] = round(time.perf_counter() - wall_start, 6)
+            record["cpu_seconds"] = round(time.process_time() - cpu_start, 6)
+            record["peak_rss_bytes"] = peak_rss_bytes()
+            if self.trace_memory:
+                record["traced_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            if profiler is not None:
+                profiler.disable()
+                self._profiling = False
+                index = self._phase_counts.get(name, 0)
+                self._phase_counts[name] = index + 1
+                profile_path = os.path.join(self.profile_dir, f"{name}_{index:03d}.prof")
+                profiler.dump_stats(profile_path)
+                record["profile"] = profile_path
+            self.emit(name, **record)
+
+    def close(self):
+        """Emits a summary of the whole run and closes the file."""
+        self.emit(
+            "run",
+            wall_seconds=round(time.perf_counter() - self._start, 6),
+            peak_rss_bytes=peak_rss_bytes(),
+            children_peak_rss_bytes=peak_rss_bytes(children=True),
+        )
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _to_json(value):
+    """Converts NumPy scalars and other stragglers for json.dumps."""
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Adds the --metrics, --profile and --trace-memory options to a parser."""
+    parser.add_argument(
+        "--metrics",
+        metavar="PATH",
+        help="append one JSON line of timings and counters per phase to PATH",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="DIR",
+        help="run every phase under cProfile and save its stats to DIR",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="record the peak Python memory of every phase with tracemalloc",
+    )
@@ -0,0 +1,149 @@
+"""
+Target-directed search for the gates a level-by-level search leaves unfound.
+
+Instead of composing every pair of known expressions one more level, a
+TargetSearch works backwards from each missing table: it asks which known
+expression can be one operand of the top gate, and what the other operand
+must then compute, which is again a search for a (looser) target.
+"""
+
+from array import array
+from typing import Sequence, Tuple, Union
+
+import numpy as np
+
+import find_tand_representations as finder
+
+
+class TargetSearch:
+    """
+    Meet-in-the-middle search for a few target tables over known expressions.
+
+    A target is a product set of tables: one mask of allowed values per truth
+    table position (a single table has one bit per position). For a known
+    left operand a, the right operands b with gate(a, b) in the target form
+    a product set again, read off the inverse of the gate table position by
+    position. `_has_known` answers for each of the 7**9 product sets whether
+    it holds a known table, so the top split of a target over the known
+    expressions costs one vectorized pass over their tables; a split whose
+    other operand must itself be built is searched the same way, one level
+    down. One operand of every split is a known expression, so targets that
+    need two new operands at the top are not found.
+    """
+
+    def __init__(self, store: "finder.ExpressionStore", best_node: array):
+        self.store = store
+        self.best_node = best_node
+        self.known_ids = np.flatnonzero(np.frombuffer(best_node, dtype=np.int32) >= 0)
+        self.known_tables = finder.ALL_TABLES[self.known_ids]
+        self._powers = 7 ** np.arange(8, -1, -1, dtype=np.int64)
+        # Bit 3 * i + v of a code is set when position i of the table is v, so
+        # a table lies in a product set when its code has no bit outside it.
+        self._shifts = 3 * np.arange(9, dtype=np.int64)
+        self._codes = (1 << (self._shifts + self.known_tables)).sum(axis=1)
+
+        # _operand_masks[g, 0, v, t] is the mask of the right operands b with
+        # gate g(v, b) in the value mask t, and [g, 1, v, t] that of the left
+        # operands a with g(a, v) in t.
+        tables = np.array([table for _, table in store.basis], dtype=np.uint8)
+        allowed = (np.arange(8)[None, None, None, :] >> tables[..., None]) & 1
+        bits = 1 << np.arange(3)
+        self._operand_masks = np.stack(
+            [
+                (allowed * bits[None, None, :, None]).sum(axis=2),
+                (allowed * bits[None, :, None, None]).sum(axis=1),
+            ],
+            axis=1,
+        ).astype(np.uint8)
+        # _operand_values[g, side, t] is the mask of the known operand values
+        # that leave some other operand for the value mask t.
+        self._operand_values = (
+            (self._operand_masks > 0) * bits[None, None, :, None]
+        ).sum(axis=2)
+
+        # Mark the sets of single known tables, then widen one position at a
+        # time: a set holds a known table if one of its narrowings does.
+        has_known = np.zeros((7,) * 9, dtype=bool)
+        has_known[tuple((1 << self.known_tables.T.astype(np.int64)) - 1)] = True
+        for axis in range(9):
+            singles = [np.take(has_known, [value], axis=axis) for value in (0, 1, 3)]
+            for mask in (3, 5, 6, 7):
+                merged = np.zeros_like(singles[0])
+                for bit, single in enumerate(singles):
+                    if mask >> bit & 1:
+                        merged |= single
+                index = [slice(None)] * 9
+                index[axis] = slice(mask - 1, mask)
+                has_known[tuple(index)] = merged
+        self._has_known = has_known.ravel()
+        self._memo = {}
+
+    def _pack(self, masks: np.ndarray) -> int:
+        """Packs 9 value masks into the code bits of a product set."""
+        return int((masks.astype(np.int64) << self._shifts).sum())
+
+    def _witness(self, masks: np.ndarray) -> int:
+        """Returns the node of a known table in the product set `masks`."""
+        inside = (self._codes & ~self._pack(masks)) == 0
+        return self.best_node[int(self.known_ids[np.argmax(inside)])]
+
+    def _operand_sets(
+        self, gate: int, side: int, masks: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Finds the known operands on `side` (0: left, 1: right) that can put
+        the result in `masks`, and the product set of their other operands.
+
+        Returns:
+            A tuple of the (M,) rows of those operands in known_tables, their
+            (M, 9) other operand masks and the (M,) indices of those sets.
+        """
+        values = self._operand_values[gate, side][masks]
+        rows = np.flatnonzero((self._codes & ~self._pack(values)) == 0)
+        operand_masks = self._operand_masks[gate, side][self.known_tables[rows], masks]
+        indices = (operand_masks.astype(np.int64) - 1) @ self._powers
+        return rows, operand_masks, indices
+
+    def solve(self, masks: np.ndarray, levels: int) -> Union[int, None]:
+        """
+        Finds an expression in the product set `masks` that is at most
+        `levels` gate applications above the known expressions.
+
+        Returns:
+            The node of the expression, or None if there is none.
+        """
+        index = int((masks.astype(np.int64) - 1) @ self._powers)
+        if not self._has_known[index]:
+            if levels == 0:
+                return None
+        else:
+            return self._witness(masks)
+        key = (index, levels)
+        if key in self._memo:
+            return self._memo[key]
+
+        node = self.solve(masks, levels - 1) if levels > 1 else None
+        for gate in range(len(self.store.basis)):
+            for side in (0, 1):
+                if node is not None:
+                    break
+                rows, operand_masks, indices = self._operand_sets(gate, side, masks)
+                if levels == 1:
+                    candidates = np.flatnonzero(self._has_known[indices])[:1]
+                else:
+                    _, first = np.unique(indices, return_index=True)
+                    candidates = np.sort(first)
+                for candidate in candidates:
+                    other = self.solve(operand_masks[candidate], levels - 1)
+                    if other is None:
+                        continue
+                    known = self.best_node[int(self.known_ids[rows[candidate]])]
+                    left, right = (known, other) if side == 0 else (other, known)
+                    node = self.store.apply(gate, left, right)
+                    break
+        self._memo[key] = node
+        return node
+
+    def find(self, flat_table: Sequence[int], levels: int) -> Union[int, None]:
+        """Finds an expression for one table, at most `levels` above the known."""
+        return self.solve(1 << np.asarray(flat_table, dtype=np.uint8), levels)
@@ -0,0 +1,36 @@
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import find_tand_representations as finder  # noqa: E402
+import generate_gates  # noqa: E402
+from gate_store import GateStore  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def store_path(tmp_path_factory):
+    """A fresh gate store of all 3,774 ternary gates, without formulas."""
+    path = str(tmp_path_factory.mktemp("store") / "gates.bin")
+    ids, class_ids = generate_gates.enumerate_classes(3)
+    GateStore.from_tables(3, generate_gates.operators_from_ids(3, ids), class_ids).save(
+        path
+    )
+    return path
+
+
+@pytest.fixture(scope="session")
+def search(store_path):
+    """Runs find_tand_representations on store_path, serially and quietly."""
+
+    def run(**options):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return finder.find_tand_representations(
+                store_path=store_path, executor="serial", **options
+            )
+
+    return run
@@ -0,0 +1,39 @@
+import numpy as np
+
+import find_tand_representations as finder
+
+
+def test_lookup_sees_a_rewritten_catalog(search, tmp_path):
+    path = str(tmp_path / "catalog.npz")
+    search(max_depth=2, catalog_path=path)
+    _, shallow_roots = finder.load_catalog(path)
+    shallow_roots = shallow_roots.copy()
+
+    search(max_depth=3, catalog_path=path)
+    _, deep_roots = finder.load_catalog(path)
+    new_ids = np.flatnonzero((shallow_roots < 0) & (deep_roots >= 0))
+    assert len(new_ids)
+
+    flat = finder.id_to_flat(int(new_ids[0]))
+    search(max_depth=2, catalog_path=path)
+    assert finder.lookup(flat, path) is None
+    search(max_depth=3, catalog_path=path)
+    entry = finder.lookup(flat, path)
+    assert entry is not None
+    assert finder.expr_to_flat_table(entry["tand_representation"]) == flat
+
+
+def test_catalog_formulas_compute_their_functions(search, tmp_path):
+    path = str(tmp_path / "catalog.npz")
+    search(max_depth=3, catalog_path=path)
+    store, roots = finder.load_catalog(path)
+    func_ids = np.flatnonzero(roots >= 0)
+    for func_id in func_ids[:: len(func_ids) // 50].tolist():
+        flat = finder.id_to_flat(func_id)
+        entry = finder.lookup(flat, path)
+        assert entry["func_id"] == func_id
+        assert finder.expr_to_flat_table(entry["tand_representation"]) == flat
+        table, operations, depth = finder._evaluate_formula(entry["tand_string"])
+        assert list(table) == flat
+        assert operations == entry["tand_operations"]
+        assert depth <= 3
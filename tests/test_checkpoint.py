@@ -0,0 +1,43 @@
+import pytest
+
+import find_tand_representations as finder
+
+
+def _formulas(gates):
+    return {
+        gate_id: gate_info["tand_string"]
+        for gate_id, gate_info in gates.items()
+        if gate_info["found"]
+    }
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        ({"max_depth": 2}, {"max_depth": 4}),
+        ({"minimal": True, "max_cost": 5}, {"minimal": True, "max_cost": 9}),
+    ],
+)
+def test_resumed_search_equals_an_uninterrupted_one(search, tmp_path, first, second):
+    checkpoint = str(tmp_path / "checkpoint.npz")
+    search(checkpoint_path=checkpoint, **first)
+    minimal = first.get("minimal", False)
+    state = finder._load_checkpoint(checkpoint, minimal, symmetric=minimal)
+    assert state["level"] == first.get("max_depth", first.get("max_cost"))
+    resumed = search(checkpoint_path=checkpoint, resume=True, **second)
+    assert _formulas(resumed) == _formulas(search(**second))
+
+
+def test_resume_rejects_a_checkpoint_of_another_mode(search, tmp_path):
+    checkpoint = str(tmp_path / "checkpoint.npz")
+    search(max_depth=2, checkpoint_path=checkpoint)
+    with pytest.raises(ValueError, match="depth search"):
+        search(minimal=True, max_cost=5, checkpoint_path=checkpoint, resume=True)
+    with pytest.raises(ValueError, match="non-symmetric search"):
+        search(max_depth=3, symmetric=True, checkpoint_path=checkpoint, resume=True)
+
+
+def test_resume_without_a_checkpoint_starts_over(search, tmp_path):
+    checkpoint = str(tmp_path / "missing.npz")
+    resumed = search(max_depth=3, checkpoint_path=checkpoint, resume=True)
+    assert _formulas(resumed) == _formulas(search(max_depth=3))
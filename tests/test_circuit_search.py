@@ -0,0 +1,95 @@
+import itertools
+import random
+
+import pytest
+
+import circuit_search
+import find_tand_representations as finder
+
+MAX_GATES = 3
+
+
+def _tand(left, right):
+    return tuple(finder.evaluate_tand(a, b) for a, b in zip(left, right))
+
+
+@pytest.fixture(scope="module")
+def smallest():
+    """
+    Maps every single function id and every pair of them to the fewest gates
+    of a TAND program of at most MAX_GATES gates that computes it, found by
+    trying every such program.
+    """
+    leaves = [
+        tuple(finder.expr_to_flat_table(leaf)) for leaf in finder.BASE_EXPRESSIONS
+    ]
+    result = {}
+
+    def extend(entries, gate_ids):
+        for key in itertools.chain(
+            ((gate_id,) for gate_id in gate_ids),
+            itertools.combinations(sorted(set(gate_ids)), 2),
+        ):
+            result[key] = min(result.get(key, MAX_GATES), len(gate_ids))
+        if len(gate_ids) == MAX_GATES:
+            return
+        for left, right in itertools.product(entries, repeat=2):
+            table = _tand(left, right)
+            extend(entries + [table], gate_ids + [finder.flat_to_id(table)])
+
+    extend(leaves, [])
+    return result
+
+
+def _check_program(circuit, flat_tables):
+    values = {
+        leaf: tuple(finder.expr_to_flat_table(leaf)) for leaf in finder.BASE_EXPRESSIONS
+    }
+    for name, left, right in circuit["program"]:
+        values[name] = _tand(values[left], values[right])
+    assert [list(values[name]) for name in circuit["outputs"]] == flat_tables
+
+
+def test_circuits_are_as_small_as_brute_force(smallest):
+    rng = random.Random(0)
+    leaf_ids = {
+        finder.flat_to_id(finder.expr_to_flat_table(leaf))
+        for leaf in finder.BASE_EXPRESSIONS
+    }
+    singles = sorted(
+        key for key in smallest if len(key) == 1 and key[0] not in leaf_ids
+    )
+    pairs = sorted(key for key in smallest if len(key) == 2 and not leaf_ids & set(key))
+    for key in rng.sample(singles, 15) + rng.sample(pairs, 15):
+        flat_tables = [finder.id_to_flat(func_id) for func_id in key]
+        circuit = circuit_search.synthesize_circuit(flat_tables, max_gates=MAX_GATES)
+        assert circuit["exact"]
+        assert circuit["gates"] == smallest[key]
+        _check_program(circuit, flat_tables)
+
+
+def test_larger_circuits_are_not_found_below_their_size(smallest):
+    rng = random.Random(1)
+    leaves = [
+        tuple(finder.expr_to_flat_table(leaf)) for leaf in finder.BASE_EXPRESSIONS
+    ]
+    # One more gate on a 3-gate program gives at most 4 gates, and brute
+    # force found none of 3 for these, so each needs exactly 4.
+    candidates = set()
+    for key, gates in smallest.items():
+        if len(key) == 1 and gates == MAX_GATES:
+            table = tuple(finder.id_to_flat(key[0]))
+            for leaf in leaves:
+                func_id = finder.flat_to_id(_tand(table, leaf))
+                if (func_id,) not in smallest:
+                    candidates.add(func_id)
+    for func_id in rng.sample(sorted(candidates), 10):
+        flat_tables = [finder.id_to_flat(func_id)]
+        assert (
+            circuit_search.synthesize_circuit(flat_tables, max_gates=MAX_GATES) is None
+        )
+        circuit = circuit_search.synthesize_circuit(
+            flat_tables, max_gates=MAX_GATES + 1
+        )
+        assert circuit["gates"] == MAX_GATES + 1
+        _check_program(circuit, flat_tables)
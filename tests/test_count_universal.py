@@ -0,0 +1,26 @@
+import subprocess
+import sys
+
+import pytest
+
+import generate_gates
+
+
+@pytest.mark.parametrize("n", [1, 2, 3])
+def test_count_matches_the_enumeration(n):
+    count = sum(len(operators) for operators in generate_gates.iter_universal(n))
+    assert generate_gates.count_universal(n) == count
+
+
+def test_count_of_four_valued_logic():
+    assert generate_gates.count_universal(4) == 942_897_552
+
+
+def test_count_rejects_five_valued_logic():
+    result = subprocess.run(
+        [sys.executable, generate_gates.__file__, "--n", "5", "--count"],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 2
+    assert "--count only finishes for n <= 4" in result.stderr
@@ -0,0 +1,61 @@
+import random
+
+import find_tand_representations as finder
+
+
+def _random_node(store, rng, depth):
+    """Builds a random TAND expression of at most `depth` levels."""
+    if depth == 0 or rng.random() < 0.2:
+        return store.leaf(rng.choice(finder.BASE_EXPRESSIONS))
+    return store.tand(
+        _random_node(store, rng, depth - 1), _random_node(store, rng, depth - 1)
+    )
+
+
+def test_subexpressions_are_stored_once():
+    store = finder.ExpressionStore()
+    leaves = len(store)
+    x, zero = store.leaf("x"), store.leaf("0")
+    inner = store.tand(x, zero)
+    assert store.tand(x, zero) == inner
+    outer = store.tand(inner, inner)
+    assert store.tand(store.tand(x, zero), inner) == outer
+    assert len(store) == leaves + 2
+    # Op counts are those of the formula tree, which repeats TAND(x, 0).
+    assert store.operations[outer] == 3
+    assert store.depth[outer] == 2
+    assert store.to_string(outer) == "TAND(TAND(x, 0), TAND(x, 0))"
+
+
+def test_nodes_agree_with_their_trees():
+    rng = random.Random(0)
+    store = finder.ExpressionStore()
+    for _ in range(200):
+        node = _random_node(store, rng, 6)
+        tree = store.to_tree(node)
+        flat = store.to_flat_table(node)
+        assert finder.expr_to_flat_table(tree) == flat
+        table, operations, depth = finder._evaluate_formula(store.to_string(node))
+        assert list(table) == flat
+        assert (operations, depth) == (store.operations[node], store.depth[node])
+
+        swapped = store.swap_inputs(node)
+        assert store.operations[swapped] == store.operations[node]
+        assert store.depth[swapped] == store.depth[node]
+        assert finder.flat_to_id(store.to_flat_table(swapped)) == int(
+            finder.TRANSPOSED_IDS[finder.flat_to_id(flat)]
+        )
+
+
+def test_store_round_trips_through_arrays():
+    rng = random.Random(1)
+    store = finder.ExpressionStore()
+    nodes = [_random_node(store, rng, 5) for _ in range(50)]
+    loaded = finder.ExpressionStore.from_arrays(store.to_arrays())
+    assert len(loaded) == len(store)
+    for node in nodes:
+        assert loaded.to_string(node) == store.to_string(node)
+    # Interning an existing expression finds the loaded node.
+    node = next(node for node in nodes if not store.is_leaf(node))
+    assert loaded.tand(loaded.left[node], loaded.right[node]) == node
+    assert len(loaded) == len(store)
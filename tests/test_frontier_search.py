@@ -0,0 +1,36 @@
+import pytest
+
+import find_tand_representations as finder
+
+
+def _depths(gates):
+    """Maps every found gate to the depth of its checked formula."""
+    result = {}
+    for gate_id, gate_info in gates.items():
+        if gate_info["found"]:
+            table, _, depth = finder._evaluate_formula(gate_info["tand_string"])
+            assert list(table) == gate_info["flat"]
+            result[gate_id] = depth
+    return result
+
+
+@pytest.mark.parametrize("max_depth", [2, 3, 4])
+def test_frontier_expansion_finds_the_same_depths(search, max_depth):
+    frontier = _depths(search(max_depth=max_depth))
+    full = _depths(search(max_depth=max_depth, frontier=False))
+    assert frontier
+    assert frontier == full
+    assert max(frontier.values()) == max_depth
+
+
+def test_each_gate_is_found_at_its_smallest_depth(search):
+    previous = {}
+    for max_depth in range(1, 5):
+        depths = _depths(search(max_depth=max_depth))
+        assert {gate_id: depths[gate_id] for gate_id in previous} == previous
+        assert all(
+            depth == max_depth
+            for gate_id, depth in depths.items()
+            if gate_id not in previous
+        )
+        previous = depths
@@ -0,0 +1,85 @@
+import json
+import shutil
+
+import numpy as np
+import pytest
+
+import find_tand_representations as finder
+import generate_gates
+from gate_store import GateStore, GateStoreWriter, gate_details, parse_formula
+from metrics import Metrics
+
+
+@pytest.fixture(scope="module")
+def classes():
+    ids, class_ids = generate_gates.enumerate_classes(3)
+    return generate_gates.operators_from_ids(3, ids), class_ids
+
+
+def test_store_round_trips_through_a_file(classes, tmp_path):
+    flats, class_ids = classes
+    path = str(tmp_path / "gates.bin")
+    GateStore.from_tables(3, flats, class_ids).save(path)
+    store = GateStore.open(path)
+    assert len(store) == len(flats) == finder.NUM_GATES
+    assert not store.searched
+    assert np.array_equal(store.records["flat"], flats)
+    assert np.array_equal(store.records["class_id"], class_ids)
+    assert store.records["func_id"].tolist() == [
+        finder.flat_to_id(flat) for flat in flats.tolist()
+    ]
+    assert store.table(7) == flats[7].reshape(3, 3).tolist()
+    assert store.formula(7) is None
+    assert store.front(7) == []
+
+
+def test_streamed_store_equals_a_saved_one(classes, tmp_path):
+    flats, class_ids = classes
+    saved, streamed = str(tmp_path / "saved.bin"), str(tmp_path / "streamed.bin")
+    GateStore.from_tables(3, flats, class_ids).save(saved)
+    with GateStoreWriter(streamed, 3) as writer:
+        for start in range(0, len(flats), 1000):
+            writer.write(flats[start : start + 1000], class_ids[start : start + 1000])
+    with open(saved, "rb") as a, open(streamed, "rb") as b:
+        assert a.read() == b.read()
+
+
+def test_failed_stream_keeps_the_old_store(classes, tmp_path):
+    flats, class_ids = classes
+    path = str(tmp_path / "gates.bin")
+    GateStore.from_tables(3, flats, class_ids).save(path)
+    with pytest.raises(RuntimeError):
+        with GateStoreWriter(path, 3) as writer:
+            writer.write(flats[:10], class_ids[:10])
+            raise RuntimeError
+    assert len(GateStore.open(path)) == len(flats)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["gates.bin"]
+
+
+def test_search_results_are_stored_with_the_gates(search, store_path, tmp_path):
+    path = str(tmp_path / "gates.bin")
+    shutil.copy(store_path, path)
+    gates = search(max_depth=3)
+    finder.update_gate_store(gates, path)
+    store = GateStore.open(path)
+    assert store.searched
+    for gate_id, gate_info in gates.items():
+        details = gate_details(store, gate_id)
+        if not gate_info["found"]:
+            assert store.formula(gate_id) is None
+            assert details["tand_representation"] is None
+            continue
+        formula = store.formula(gate_id)
+        assert formula == gate_info["tand_string"]
+        assert finder.expr_to_flat_table(parse_formula(formula)) == store.flat(gate_id)
+        assert details["tand_operations"] == gate_info["tand_operations"]
+
+
+def test_generating_gates_writes_the_web_data(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    generate_gates.main_store(Metrics())
+    with open(tmp_path / "gate_data" / "index.json") as f:
+        index = json.load(f)
+    assert index["count"] == finder.NUM_GATES
+    assert index["classes"] == 322
+    assert index["ops"] == [None] * finder.NUM_GATES
@@ -0,0 +1,50 @@
+import numpy as np
+
+import cost_matrix
+import find_tand_representations as finder
+
+MAX_COST = 10
+
+
+def _costs(gates):
+    """Maps every found gate to the (op count, depth) of its checked formula."""
+    result = {}
+    for gate_id, gate_info in gates.items():
+        if gate_info["found"]:
+            table, operations, depth = finder._evaluate_formula(
+                gate_info["tand_string"]
+            )
+            assert list(table) == gate_info["flat"]
+            assert operations == gate_info["tand_operations"]
+            result[gate_id] = (operations, depth)
+    return result
+
+
+def test_minimal_search_finds_the_fewest_tand_gates(search):
+    gates = search(minimal=True, max_cost=MAX_COST)
+    found = _costs(gates)
+    func_ids = {
+        gate_id: finder.flat_to_id(gate_info["flat"])
+        for gate_id, gate_info in gates.items()
+    }
+    # The closure runs whole cost layers, so it costs every gate of at most
+    # MAX_COST TAND gates once the found ones are reached.
+    costs = cost_matrix.closure_costs(
+        finder.basis_weights(finder.TAND_BASIS),
+        np.array([func_ids[gate_id] for gate_id in found]),
+    )
+    assert found
+    assert {gate_id: ops for gate_id, (ops, _) in found.items()} == {
+        gate_id: int(costs[func_id])
+        for gate_id, func_id in func_ids.items()
+        if costs[func_id] <= MAX_COST
+    }
+
+
+def test_depth_search_never_beats_the_minimal_count(search):
+    minimal = _costs(search(minimal=True, max_cost=MAX_COST))
+    shallow = _costs(search(max_depth=4))
+    for gate_id, (operations, depth) in shallow.items():
+        if gate_id in minimal:
+            assert operations >= minimal[gate_id][0]
+            assert depth <= minimal[gate_id][1]
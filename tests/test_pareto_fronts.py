@@ -0,0 +1,72 @@
+import contextlib
+import io
+import subprocess
+import sys
+
+import pytest
+
+import find_tand_representations as finder
+from metrics import Metrics
+
+
+@pytest.mark.parametrize(
+    "option",
+    [["--minimal"], ["--catalog"], ["--resume"], ["--targeted"], ["--symmetry"]],
+)
+def test_pareto_rejects_options_it_would_ignore(option):
+    result = subprocess.run(
+        [sys.executable, finder.__file__, "--pareto"] + option,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 2
+    assert f"--pareto cannot be combined with {option[0]}" in result.stderr
+
+
+@pytest.fixture(scope="module")
+def pareto(store_path):
+    records = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        gates = finder.find_pareto_fronts(
+            4, store_path, executor="serial", metrics=Metrics(callback=records.append)
+        )
+    return gates, records
+
+
+def test_front_points_compute_their_gates(pareto):
+    gates, _ = pareto
+    for gate_info in gates.values():
+        if not gate_info["found"]:
+            continue
+        front = gate_info["front"]
+        for point in front:
+            table, operations, depth = finder._evaluate_formula(point["tand_string"])
+            assert list(table) == gate_info["flat"]
+            assert (operations, depth) == (point["tand_operations"], point["depth"])
+            assert depth <= 4
+        # Each point is deeper and cheaper than the one before it.
+        for before, after in zip(front, front[1:]):
+            assert after["depth"] > before["depth"]
+            assert after["tand_operations"] < before["tand_operations"]
+        assert gate_info["tand_string"] == front[0]["tand_string"]
+
+
+def test_fronts_span_the_shallowest_and_cheapest_formulas(pareto, search):
+    gates, records = pareto
+    shallowest = search(max_depth=4)
+    cheapest = search(minimal=True, max_cost=12)
+    assert {gate_id for gate_id, info in gates.items() if info["found"]} == {
+        gate_id for gate_id, info in shallowest.items() if info["found"]
+    }
+    for gate_id, gate_info in gates.items():
+        if not gate_info["found"]:
+            continue
+        front = gate_info["front"]
+        _, _, depth = finder._evaluate_formula(shallowest[gate_id]["tand_string"])
+        assert front[0]["depth"] == depth
+        if cheapest[gate_id]["found"]:
+            assert front[-1]["tand_operations"] >= cheapest[gate_id]["tand_operations"]
+    (record,) = [record for record in records if record["event"] == "pareto_fronts"]
+    assert record["found"] == len(shallowest) - sum(
+        not info["found"] for info in shallowest.values()
+    )
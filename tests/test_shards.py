@@ -0,0 +1,50 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+import generate_gates
+
+
+def _merge(tmp_path, count, symmetric):
+    output_dir = str(tmp_path / f"{count}_{symmetric}")
+    found = generate_gates.run_shards(
+        3, range(count), count, 1, output_dir, symmetric, executor="serial"
+    )
+    total = generate_gates.merge_shards(3, count, output_dir, symmetric)
+    assert found == total
+    with open(os.path.join(output_dir, "universal_n3.json")) as f:
+        header = json.load(f)
+    bits = np.fromfile(os.path.join(output_dir, header["bitmap"]), dtype=np.uint8)
+    return header, np.flatnonzero(np.unpackbits(bits)[: header["total_ops"]])
+
+
+@pytest.mark.parametrize("symmetric", [False, True])
+def test_merged_shards_equal_a_single_shard(tmp_path, monkeypatch, symmetric):
+    # Small blocks, so that n=3 spreads over several shards.
+    monkeypatch.setattr(generate_gates, "BLOCK_SIZE", 1024)
+    single_header, single_ids = _merge(tmp_path, 1, symmetric)
+    header, ids = _merge(tmp_path, 5, symmetric)
+
+    expected, _ = generate_gates.enumerate_classes(3)
+    assert header["count"] == single_header["count"] == len(expected) == 3774
+    assert np.array_equal(single_ids, expected)
+    assert np.array_equal(ids, expected)
+    if symmetric:
+        classes = generate_gates.operator_ids(
+            generate_gates.universal_representatives(3), 3
+        )
+        assert header["classes"] == len(classes)
+        path = tmp_path / "5_True" / header["representatives"]
+        assert np.array_equal(np.load(str(path)), classes)
+
+
+@pytest.mark.parametrize("symmetric", [False, True])
+def test_shards_cover_every_id_once(symmetric):
+    ranges = [generate_gates.shard_range(3, i, 7, symmetric) for i in range(7)]
+    if symmetric:
+        assert (ranges[0][0], ranges[-1][1]) == generate_gates.representative_range(3)
+    else:
+        assert (ranges[0][0], ranges[-1][1]) == (0, 3**9)
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
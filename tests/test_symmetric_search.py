@@ -0,0 +1,42 @@
+import pytest
+
+import find_tand_representations as finder
+
+
+def _costs(gates):
+    """Maps every found gate to the (depth, op count) of its checked formula."""
+    result = {}
+    for gate_id, gate_info in gates.items():
+        if gate_info["found"]:
+            table, operations, depth = finder._evaluate_formula(
+                gate_info["tand_string"]
+            )
+            assert list(table) == gate_info["flat"]
+            assert operations == gate_info["tand_operations"]
+            result[gate_id] = (depth, operations)
+    return result
+
+
+def test_minimal_search_finds_the_same_costs(search):
+    symmetric = _costs(search(minimal=True, max_cost=11, symmetric=True))
+    ordered = _costs(search(minimal=True, max_cost=11, symmetric=False))
+    assert symmetric
+    assert {gate_id: ops for gate_id, (_, ops) in symmetric.items()} == {
+        gate_id: ops for gate_id, (_, ops) in ordered.items()
+    }
+
+
+@pytest.mark.parametrize("max_depth", [3, 4])
+def test_depth_search_finds_the_same_depths(search, max_depth):
+    symmetric = _costs(search(max_depth=max_depth, symmetric=True))
+    ordered = _costs(search(max_depth=max_depth, symmetric=False))
+    assert {gate_id: depth for gate_id, (depth, _) in symmetric.items()} == {
+        gate_id: depth for gate_id, (depth, _) in ordered.items()
+    }
+
+
+def test_symmetry_is_the_default_by_tand_count_only(search):
+    assert _costs(search(max_depth=4)) == _costs(search(max_depth=4, symmetric=False))
+    assert _costs(search(minimal=True, max_cost=9)) == _costs(
+        search(minimal=True, max_cost=9, symmetric=True)
+    )
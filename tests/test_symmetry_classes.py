@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+import generate_gates
+
+
+@pytest.mark.parametrize("n", [2, 3])
+def test_classes_cover_the_universal_operators(n):
+    ids, class_ids = generate_gates.enumerate_classes(n)
+    expected = np.concatenate(list(generate_gates.iter_universal(n, ids=True)))
+    assert np.array_equal(ids, expected)
+    # Classes are numbered by the smallest id of their orbit.
+    first = np.unique(class_ids, return_index=True)[1]
+    assert np.array_equal(np.unique(class_ids), np.arange(len(first)))
+    assert np.all(np.diff(ids[first]) > 0)
+
+
+def test_classes_are_the_orbits_of_the_symmetry_group():
+    n = 3
+    ids, class_ids = generate_gates.enumerate_classes(n)
+    group = generate_gates.symmetry_group(n)
+    orbits = generate_gates.orbit_ids(
+        generate_gates.operators_from_ids(n, ids), group, n
+    )
+    class_of = dict(zip(ids.tolist(), class_ids.tolist()))
+    for class_id, orbit in zip(class_ids.tolist(), orbits):
+        assert {class_of[image] for image in orbit.tolist()} == {class_id}
+    sizes = np.bincount(class_ids)
+    assert np.array_equal(
+        sizes[class_ids],
+        generate_gates.orbit_sizes(generate_gates.operators_from_ids(n, ids), group, n),
+    )
+
+
+def test_representatives_are_the_smallest_of_their_orbits():
+    n = 3
+    representatives = generate_gates.universal_representatives(n)
+    ids, class_ids = generate_gates.enumerate_classes(n)
+    first = np.unique(class_ids, return_index=True)[1]
+    assert np.array_equal(generate_gates.operator_ids(representatives, n), ids[first])
+    start, stop = generate_gates.representative_range(n)
+    assert np.all((ids[first] >= start) & (ids[first] < stop))
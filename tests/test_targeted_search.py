@@ -0,0 +1,64 @@
+from array import array
+
+import numpy as np
+import pytest
+
+import find_tand_representations as finder
+import targeted_search
+
+
+def _depths(gates):
+    """Maps every found gate to (depth, formula table) of its formula."""
+    result = {}
+    for gate_id, gate_info in gates.items():
+        if gate_info["found"]:
+            table, _, depth = finder._evaluate_formula(gate_info["tand_string"])
+            result[gate_id] = (depth, list(table))
+    return result
+
+
+@pytest.fixture(scope="module")
+def direct(search):
+    return _depths(search(max_depth=5))
+
+
+@pytest.mark.parametrize("levels", [1, 2])
+def test_targeted_formulas_match_a_direct_search(search, direct, levels):
+    searched = search(max_depth=3)
+    targeted = search(max_depth=3, targeted_levels=levels)
+    found = _depths(targeted)
+
+    for gate_id, (depth, table) in found.items():
+        assert table == targeted[gate_id]["flat"]
+        # The top split has one known operand (depth <= 3) and one built at
+        # most `levels` above the known expressions.
+        assert depth <= 3 + levels + 1
+        if depth <= 5:
+            assert direct[gate_id][0] <= depth
+    # Every gate a direct search reaches at depth 4 splits into two known
+    # operands, so even one targeted level finds it.
+    assert {gate_id for gate_id, (depth, _) in direct.items() if depth <= 4} <= set(
+        found
+    )
+    assert set(found) > {
+        gate_id for gate_id, gate_info in searched.items() if gate_info["found"]
+    }
+
+
+def test_target_search_finds_known_targets(store_path, search, direct, tmp_path):
+    catalog = str(tmp_path / "catalog.npz")
+    search(max_depth=3, catalog_path=catalog)
+    store, roots = finder.load_catalog(catalog)
+    target_search = targeted_search.TargetSearch(
+        store, array("i", roots.astype(np.int32).tobytes())
+    )
+
+    gates = finder._load_gates(store_path)
+    targets = sorted(gate_id for gate_id, (depth, _) in direct.items() if depth == 4)
+    for gate_id in targets[:: len(targets) // 4]:
+        flat = gates[gate_id]["flat"]
+        assert target_search.find(flat, 0) is None
+        node = target_search.find(flat, 1)
+        assert node is not None
+        assert store.to_flat_table(node) == flat
+        assert store.depth[node] <= 3 + 1 + 1